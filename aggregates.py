@@ -0,0 +1,121 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from data import remove_stale
+
+DIMENSIONS = ['online_order', 'book_table', 'location', 'rest_type', 'cuisines', 'type',
+              'rate_category', 'vote_category', 'cost_category']
+MEASURES = ['rate', 'votes', 'avg_cost_per_plate']
+SUMS = [f'{measure}_sum' for measure in MEASURES]
+# Sums of squares, for the spread of a measure inside a cell (see insights.means)
+SQUARES = [f'{measure}_sq' for measure in MEASURES]
+TOTALS = [*SUMS, *SQUARES]
+# Bump when the cube layout or the features feeding it change, so saved cubes are rebuilt
+CUBE_VERSION = 3
+
+
+def build_cube(df):
+    # One groupby over every dimension the page slices by; charts roll this up instead of scanning rows.
+    # Also returns the cube row (cell) of every listing, so filtered cubes are a bincount away.
+    values = df[MEASURES].astype('float64')
+    sums = pd.concat([values.set_axis(SUMS, axis=1), (values ** 2).set_axis(SQUARES, axis=1)], axis=1)
+    grouped = sums.groupby([df[d] for d in DIMENSIONS], observed=True)
+    cube = grouped.sum()
+    cube.insert(0, 'count', grouped.size())
+    return cube.reset_index(), grouped.ngroup().to_numpy('int32')
+
+
+def build_aggregates(df):
+    cube, cells = build_cube(df)
+    return {
+        'cube': cube,
+        'cells': pd.DataFrame({'cell': cells}),
+        # name has thousands of values, so it gets its own count instead of a cube dimension
+        'names': df['name'].value_counts().rename('count').reset_index(),
+    }
+
+
+def filter_cube(cube, cells, df, mask):
+    # Re-aggregates only the masked listings into the existing cube cells; keeps the cube's index
+    cells = cells[mask]
+    counts = np.bincount(cells, minlength=len(cube))
+    filtered = cube[DIMENSIONS].assign(count=counts)
+    for measure, total, square in zip(MEASURES, SUMS, SQUARES):
+        values = df[measure].to_numpy('float64')[mask]
+        filtered[total] = np.bincount(cells, weights=values, minlength=len(cube))
+        filtered[square] = np.bincount(cells, weights=values ** 2, minlength=len(cube))
+    return filtered[counts > 0]
+
+
+def rollup(cube, by):
+    # count, sums and means of every measure per group of `by`
+    grouped = cube.groupby(by, observed=True)[['count', *SUMS]].sum()
+    for measure, total in zip(MEASURES, SUMS):
+        grouped[measure] = grouped[total] / grouped['count']
+    return grouped
+
+
+def crosstab(cube, index, columns, normalize=False):
+    table = cube.groupby([index, columns], observed=True)['count'].sum().unstack(fill_value=0)
+    table.columns = list(table.columns)
+    table.columns.name = columns
+    return normalize_table(table, normalize)
+
+
+def normalize_table(table, normalize=False):
+    # Same normalize options as pd.crosstab
+    if normalize == 'index':
+        return table.div(table.sum(axis=1), axis=0)
+    if normalize == 'columns':
+        return table.div(table.sum(axis=0), axis=1)
+    return table
+
+
+def exclude_others(cube, *columns):
+    mask = pd.Series(False, index=cube.index)
+    for column in columns:
+        mask |= cube[column].str.contains('others')
+    return cube[~mask]
+
+
+def aggregates_folder(sidecar):
+    # Saved next to the dataset sidecar, so it shares its content hash and cleanup
+    return os.path.splitext(sidecar)[0] + f'-aggregates-v{CUBE_VERSION}'
+
+
+def save_aggregates(aggregates, folder):
+    tmp = folder + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for key, frame in aggregates.items():
+        frame.to_parquet(os.path.join(tmp, f'{key}.parquet'), index=False)
+    # A directory cannot be replaced while it has files, so an existing one is moved aside first
+    old = folder + '.old'
+    if os.path.isdir(folder):
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(folder, old)
+    os.replace(tmp, folder)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def load_aggregates(folder):
+    return {os.path.splitext(file)[0]: pd.read_parquet(os.path.join(folder, file))
+            for file in sorted(os.listdir(folder)) if file.endswith('.parquet')}
+
+
+def read_or_build_aggregates(df, sidecar):
+    folder = aggregates_folder(sidecar)
+    if os.path.isdir(folder):
+        return load_aggregates(folder)
+
+    aggregates = build_aggregates(df)
+    try:
+        # A new cube layout of an unchanged csv leaves the old layout's folder behind otherwise
+        remove_stale(sidecar)
+        save_aggregates(aggregates, folder)
+    except (OSError, ImportError):
+        pass
+    return aggregates
@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from aggregates import build_aggregates, filter_cube, rollup
+from charts import CHARTS, ChartData
+from cuisine_index import CuisineIndex
+from data import DATA_PATH, read_dataset, sidecar_path
+from features import add_features
+from ingest import stream_aggregates
+from filters import build_bitmasks, select
+from outlets import OutletIndex
+from viewer import build_viewer_index, page
+
+SIZES = [50_000, 500_000, 5_000_000]
+# A stage counts as a regression when it gets this much slower (or bigger) than the baseline
+TOLERANCE = 0.25
+# Figure stages are side-effect free, so they are timed best of this many runs
+REPEAT = 3
+
+
+def synthetic_dataset(rows, source=DATA_PATH, seed=0):
+    # Bootstraps whole listings of the real csv, so location / rest_type / cuisines / type keep their
+    # cardinalities and joint distribution; names and votes are perturbed so they keep growing with size
+    real = pd.read_csv(source)
+    rng = np.random.default_rng(seed)
+    df = real.iloc[rng.integers(0, len(real), rows)].reset_index(drop=True)
+
+    # Branches: about one distinct name per 6 listings, like the real data
+    branch = rng.integers(0, max(1, rows // (6 * real['name'].nunique())) + 1, rows)
+    df['name'] = np.where(branch > 0, df['name'] + ' #' + branch.astype(str), df['name'])
+    df['votes'] = np.round(df['votes'] * rng.lognormal(0, 0.3, rows)).astype('int64')
+    return df
+
+
+class Stages:
+    # Wall time, peak allocation and an optional size per named stage
+
+    def __init__(self):
+        self.results = {}
+
+    def run(self, name, fn, *args, trace=True, repeat=1):
+        # tracemalloc slows allocation-heavy pure python code (plotly figure building) several times
+        # over, so stages built from many small objects are timed untraced, best of `repeat` runs
+        if trace:
+            tracemalloc.start()
+        seconds = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            value = fn(*args)
+            seconds = min(seconds, time.perf_counter() - start)
+        self.results[name] = {'seconds': round(seconds, 4)}
+        if trace:
+            self.results[name]['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+            tracemalloc.stop()
+        return value
+
+    def size(self, name, n_bytes):
+        self.results[name]['bytes'] = n_bytes
+
+
+def bench_size(rows, folder, repeat=REPEAT):
+    path = os.path.join(folder, f'synthetic-{rows}.csv')
+    synthetic_dataset(rows).to_csv(path, index=False)
+    stages = Stages()
+
+    # Cold load parses the csv and writes the parquet sidecar, warm load reads the sidecar
+    stages.run('load_csv', read_dataset, path)
+    df = stages.run('load_parquet', read_dataset, path)
+    breakpoints = stages.run('features', add_features, df)
+    # Out-of-core path over the same csv (two chunked passes), for comparison with the in-memory stages
+    stages.run('stream_aggregates', stream_aggregates, path)
+
+    aggregates = stages.run('aggregates', build_aggregates, df)
+    cube = aggregates['cube']
+    stages.run('rollup_location', rollup, cube, 'location')
+    cuisines = stages.run('cuisine_index', CuisineIndex, cube['cuisines'])
+    stages.run('cuisine_counts', cuisines.counts, cube['count'].to_numpy())
+    outlets = stages.run('outlet_index', OutletIndex, df)
+    stages.run('outlet_aggregates', build_aggregates, stages.run('outlet_frame', outlets.frame, df))
+    bitmasks = stages.run('bitmasks', build_bitmasks, df)
+    # A typical sidebar selection: two locations, online ordering, a rating floor
+    selections = {'location': list(df['location'].cat.categories[:2]), 'online_order': [True]}
+    ranges = {'rate': (3.5, float(df['rate'].max()))}
+    mask = stages.run('filter_mask', select, bitmasks, len(df), selections, ranges, df)
+    stages.run('filter_cube', filter_cube, cube, aggregates['cells']['cell'].to_numpy(), df, mask)
+    index = stages.run('viewer_index', build_viewer_index, df)
+    stages.run('viewer_page', page, df, index, 'cafe', 'rate')
+
+    data = ChartData(cube, cube, aggregates['names'], cuisines, frame=df)
+    for spec_id, build in CHARTS.items():
+        fig = stages.run(f'figure:{spec_id}', build, data, trace=False, repeat=repeat)
+        spec = stages.run(f'json:{spec_id}', fig.to_json, trace=False, repeat=repeat)
+        stages.size(f'json:{spec_id}', len(spec.encode()))
+
+    for file in [path, sidecar_path(path)]:
+        os.remove(file)
+    return {
+        'rows': rows,
+        'breakpoints': {name: values.tolist() for name, values in breakpoints.items()},
+        'stages': stages.results,
+        'totals': {
+            'figure_seconds': round(sum(v['seconds'] for k, v in stages.results.items() if k.startswith('figure:')), 4),
+            'payload_bytes': sum(v['bytes'] for k, v in stages.results.items() if k.startswith('json:')),
+        },
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(sizes, repeat=REPEAT):
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        for rows in sizes:
+            start = time.perf_counter()
+            results.append(bench_size(rows, folder, repeat))
+            print(f'{rows:>10,} rows  {time.perf_counter() - start:7.1f}s', file=sys.stderr, flush=True)
+    return {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        # ru_maxrss is in KiB on Linux
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10, 1),
+        'results': results,
+    }
+
+
+def compare(current, baseline, tolerance=TOLERANCE):
+    # Stages that got slower / bigger than baseline * (1 + tolerance); tiny stages are too noisy to judge
+    regressions = []
+    previous = {r['rows']: r['stages'] for r in baseline['results']}
+    for result in current['results']:
+        for name, stage in result['stages'].items():
+            old = previous.get(result['rows'], {}).get(name)
+            if old is None:
+                continue
+            for metric, floor in [('seconds', 0.1), ('peak_mb', 16), ('bytes', 64 * 2**10)]:
+                if metric in stage and old.get(metric, 0) >= floor and stage[metric] > old[metric] * (1 + tolerance):
+                    regressions.append((result['rows'], name, metric, old[metric], stage[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time every pipeline stage on synthetic data of growing size.')
+    parser.add_argument('--rows', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--output', help='write the results as json to this file (default: stdout)')
+    parser.add_argument('--baseline', help='results json of an earlier commit to compare against')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='runs per figure stage (best one counts)')
+    args = parser.parse_args()
+
+    results = run(args.rows, args.repeat)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+    else:
+        print(json.dumps(results, indent=1))
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for rows, name, metric, old, new in regressions:
+            print(f'REGRESSION {rows:,} rows  {name}  {metric}: {old} -> {new}', file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
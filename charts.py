@@ -0,0 +1,334 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from aggregates import crosstab, exclude_others, rollup
+from data import YES_NO
+from density import SCATTER_THRESHOLD, density_figure, heatmap_figure, sampled_scatter_figure
+from heatmaps import TOP_COLUMNS, fit, heatmap, heatmap_trace
+from combos import SEPARATOR, cooccurrence, itemsets
+from similarity import location_profiles, similarity_matrix, spectral_order
+
+
+class ChartData:
+    # What the charts read: the (possibly filtered) cube, the full cube the cuisine index was built on,
+    # restaurant name counts and, for the scatter plots only, the selected listings (or, for datasets
+    # streamed from a csv too big to hold, their density grids per scatter x column)
+
+    def __init__(self, cube, full_cube, names, cuisines, frame=None, mask=None, densities=None):
+        self.cube = cube
+        self.full_cube = full_cube
+        self.names = names
+        self.cuisines = cuisines
+        self.frame = frame
+        self.mask = mask
+        self.densities = densities
+        self._rows = None
+
+    @property
+    def rows(self):
+        # Selected listings, only materialized when a chart actually needs rows
+        if self._rows is None:
+            self._rows = self.frame if self.mask is None else self.frame[self.mask]
+        return self._rows
+
+    def cube_weights(self, rows=None):
+        # Counts of the cube aligned to the full cube; rows optionally restricts which cube rows count
+        weights = self.cube['count'] if rows is None else self.cube['count'].where(rows, 0)
+        return weights.reindex(self.full_cube.index, fill_value=0).to_numpy()
+
+    def cuisine_crosstab(self, label, rows=None, normalize=False):
+        return self.cuisines.crosstab(self.full_cube[label], weights=self.cube_weights(rows), normalize=normalize)
+
+
+def without_others(temp, column):
+    return temp.drop(index=temp[temp[column] == 'others'].index)
+
+
+# Basic insights
+
+def top_restaurants(data):
+    temp = data.names.head(20)
+    fig = px.bar(temp,x='name',y='count',color = 'name',hover_name = 'name',text_auto = True,
+             title = 'Top 20 Most Popular Restaurants in Bangalore')
+    fig.update_layout(xaxis = dict(title ='restaurant'))
+    return fig
+
+
+def crowded_locations(data):
+    temp = rollup(data.cube, 'location')['count'].sort_values(ascending=False).reset_index()
+    temp = without_others(temp, 'location').reset_index(drop=True)
+    return px.bar(temp, x='location', y='count', color='location', hover_name='location', title='Top Crowded Restaurants Location in Banglore')
+
+
+def online_order_share(data):
+    temp = rollup(data.cube, 'online_order')['count'].rename(index=YES_NO).reset_index()
+    return px.pie(temp, values='count', names='online_order', hole=0.5,
+                  hover_name='online_order', title='Restaurants Providing Online/Offline Facility')
+
+
+def book_table_share(data):
+    temp = rollup(data.cube, 'book_table')['count'].rename(index=YES_NO).reset_index()
+    return px.pie(temp, values='count', names='book_table', hole=0.5,
+                  hover_name='book_table', title='Book Table Facility Distribution')
+
+
+# 1. Online ordering and table booking
+
+def online_order_by_location(data):
+    temp_df = crosstab(exclude_others(data.cube, 'location'), 'location', 'online_order').rename(columns=YES_NO)
+    return px.bar(temp_df,x=temp_df.index,y=temp_df.columns,barmode='group',title = 'Online/Offline Orders vs Location',color_discrete_map={'Yes':'Red','No':'Blue'})
+
+
+def online_order_summary(data):
+    return rollup(data.cube, 'online_order')[['rate','votes','avg_cost_per_plate']].round(2).rename(index=YES_NO)
+
+
+def treemap_frame(cube, flag):
+    # One leaf per (flag, location) that has listings: a filtered cube still carries every location category,
+    # and empty leaves would each become a node. Path columns as plain strings for px.treemap
+    temp = rollup(cube, [flag, 'location']).reset_index()
+    temp = temp[temp['count'] > 0]
+    return temp.assign(**{flag: temp[flag].map(YES_NO), 'location': temp['location'].astype(str)})
+
+
+def online_order_treemap(data):
+    temp = treemap_frame(data.cube, 'online_order')
+    fig = px.treemap(temp, path=[px.Constant('Online Order Facility'), 'online_order', 'location'],
+                     values='count', color='avg_cost_per_plate', color_continuous_scale='plasma',
+                     title = 'Average Cost per plate based on Online/Offline Order facility')
+    fig.update_layout(height = 500, width = 1200)
+    return fig
+
+
+def book_table_summary(data):
+    temp = rollup(data.cube, 'book_table')[['rate','votes_sum','avg_cost_per_plate']].rename(columns={'votes_sum':'votes'}).round(2)
+    return temp.astype({'votes':'int64'}).rename(index=YES_NO)
+
+
+def book_table_treemap(data):
+    temp = treemap_frame(data.cube, 'book_table')
+    fig = px.treemap(temp, path=[px.Constant('Book Table Facility'), 'book_table', 'location'],
+                     values='count', color='avg_cost_per_plate', color_continuous_scale= 'plasma')
+    fig.update_layout(height=500, width=1200)
+    return fig
+
+
+def online_order_by_rest_type(data):
+    temp_df = (crosstab(exclude_others(data.cube, 'rest_type'), 'online_order', 'rest_type', normalize='index')*100).round().rename(index=YES_NO)
+    return px.imshow(temp_df,text_auto = True,color_continuous_scale = 'viridis',title = 'Comparison of Online and Offline Ordering by Restaurant Type')
+
+
+# 2. Location
+
+def book_table_by_location(data):
+    temp_df = crosstab(exclude_others(data.cube, 'location'), 'location', 'book_table').rename(columns=YES_NO)
+    return px.bar(temp_df, x=temp_df.index, y=temp_df.columns, barmode='group',color_discrete_map={'Yes':'Red','No':'Blue'},
+                  title = 'Presence of Table Booking Facilities Across Different Locations')
+
+
+def cost_by_location(data):
+    temp = rollup(data.cube, 'location')['avg_cost_per_plate'].round().sort_values(ascending = False).reset_index()
+    fig = px.bar(temp,x='location',y='avg_cost_per_plate',color='location',text_auto = True,hover_name = 'avg_cost_per_plate',
+                 title = 'Average cost per plate on different Locations')
+    fig.update_layout(yaxis=dict(title='Avgerage cost per plate'))
+    return fig
+
+
+def cost_category_by_location(data):
+    temp_df = crosstab(exclude_others(data.cube, 'location'), 'location', 'cost_category')
+    return px.bar(temp_df, x=temp_df.index, y=temp_df.columns,
+                  title='Distribution of Cost Categories Among Restaurants Across Locations')
+
+
+def votes_by_location(data):
+    temp = without_others(rollup(data.cube, 'location')['votes'].round(2).sort_values(ascending=False).reset_index(), 'location')
+    return px.bar(temp, x='location', y='votes', color='location', text_auto=True, hover_name= 'location',
+                  title='Average Restaurant Voting on Different Location')
+
+
+def rate_by_location(data):
+    temp = without_others(rollup(data.cube, 'location')['rate'].round(2).sort_values(ascending=False).reset_index(), 'location')
+    return px.bar(temp, x='location', y='rate', color='location', text_auto=True,hover_name= 'location',
+                  title='Average Restaurant Rating on Different Location')
+
+
+def rest_type_by_location(data):
+    temp = crosstab(data.cube, 'rest_type', 'location')
+    fig = heatmap(temp, 'Location-wise Distribution of Restaurant types', colorscale='cividis')
+    fig.update_layout(height=600, width=900, yaxis=dict(title='restaurant type'))
+    return fig
+
+
+def neighborhood_similarity(data, method='cosine'):
+    temp = similarity_matrix(location_profiles(data), method)
+    order = spectral_order(temp)
+    temp = temp.iloc[order, order].round(3)
+    fig = px.imshow(temp, title=f'Similarity between Neighborhoods based on Food ({method})', color_continuous_scale='plasma',
+                    height=700, width=900)
+    fig.update_layout(xaxis=dict(title=''), yaxis=dict(title=''))
+    return fig
+
+
+# 3. Cuisine
+
+def cuisines_by_online_order(data):
+    temp_df = data.cuisine_crosstab('online_order').rename(index=YES_NO)
+    return heatmap(temp_df, 'Percentage Distribution of Restaurant Cuisines by Online/Offline Ordering Preference"', rows=None,
+                   normalize='index', percent=True, colorscale='viridis')
+
+
+def cuisines_by_book_table(data):
+    temp_df = data.cuisine_crosstab('book_table').rename(index=YES_NO)
+    return heatmap(temp_df, 'Percentage Distribution of Restaurant Cuisines by Table Booking Availability', rows=None,
+                   normalize='index', percent=True, colorscale='jet')
+
+
+def crowded_split(data):
+    # Locations at or below / above the median listing count (the second busiest is left out, as in the notebook)
+    temp = rollup(data.cube, 'location')['count'].sort_values(ascending=False).reset_index()
+    temp.drop(index=1, inplace=True, errors='ignore')
+    temp = temp.reset_index(drop=True)
+    less_crowded = temp[temp['count'] <= temp['count'].quantile(0.5)]['location'].tolist()
+    more_crowded = temp[temp['count'] > temp['count'].quantile(0.5)]['location'].tolist()
+    return less_crowded, more_crowded
+
+
+def less_crowded_cuisines(data):
+    temp_df1 = data.cuisine_crosstab('location', rows=data.cube['location'].isin(crowded_split(data)[0]))
+    # Locations with a similar cuisine mix sit next to each other
+    return heatmap(temp_df1, 'Less Crowded Places and Preferred Cuisines', order_rows='cluster')
+
+
+def more_crowded_cuisines(data):
+    temp_df2 = data.cuisine_crosstab('location', rows=data.cube['location'].isin(crowded_split(data)[1]))
+    return heatmap(temp_df2, 'More Crowded Places and Preferred Cuisines', order_rows='cluster')
+
+
+def cuisines_by_rest_type(data):
+    temp_df = data.cuisine_crosstab('rest_type', rows=~data.cube['rest_type'].str.contains('others'))
+    fig = heatmap(temp_df, 'Distribution of Cuisines by Restaurant Type', normalize='columns', percent=True, colorscale='jet')
+    fig.update_layout(width=1100,height = 600)
+    fig.update_layout(yaxis = dict(title= 'Restaurant Type'))
+    return fig
+
+
+def cuisines_by_rate_and_vote(data):
+    temp_df1 = data.cuisine_crosstab('rate_category')
+    temp_df2 = data.cuisine_crosstab('vote_category')
+    # Both panels share the cuisine axis, so they are folded together: same kept cuisines, one budget
+    temp = fit(pd.concat([temp_df1, temp_df2]).fillna(0), rows=None, columns=TOP_COLUMNS)
+    temp_df1, temp_df2 = temp.iloc[:len(temp_df1)], temp.iloc[len(temp_df1):]
+
+    fig = make_subplots(rows=2, cols=1, subplot_titles=("Rate Category vs. Cuisine", "Vote Category vs. Cuisine"),shared_xaxes = True)
+    fig.add_trace(heatmap_trace(temp_df1.rename_axis('rate_category'), 'plasma'), row=1, col=1)
+    fig.add_trace(heatmap_trace(temp_df2.rename_axis('vote_category'), 'plasma'), row=2, col=1)
+    fig.update_layout(width=1000,height = 600)
+    return fig
+
+
+def cuisine_counts(data):
+    temp = data.cuisines.counts(data.cube_weights()).drop('others', errors='ignore').sort_values(ascending=False).reset_index()
+    return px.bar(temp, x='cuisines', y='count', color='cuisines', text_auto=True, title='Listings Serving Each Cuisine')
+
+
+def cuisine_cooccurrence(data, top=20):
+    # Lift of every pair among the cuisines in the most frequent pairs: above 1 they are served together
+    # more often than their own popularity explains
+    pairs = itemsets(data.cuisines, data.cube_weights())
+    if pairs.empty:
+        # A selection (or city) too small for any frequent pair gets an empty chart instead of an error
+        fig = go.Figure()
+        fig.update_layout(title='Cuisines Served Together (lift)', height=700, width=900,
+                          annotations=[dict(text='No cuisine pair is frequent enough in this selection.',
+                                            showarrow=False, xref='paper', yref='paper', x=0.5, y=0.5)])
+        return fig
+    counts = cooccurrence(data.cuisines, data.cube_weights())
+    names = list(dict.fromkeys(name for pair in pairs['cuisines'].str.split(SEPARATOR, regex=False) for name in pair))[:top]
+    counts = counts.loc[names, names]
+    singles = pd.Series(counts.to_numpy().diagonal(), index=names)
+    total = data.cube['count'].sum()
+    lift = counts * total / np.outer(singles, singles).clip(1)
+    for name in names:
+        lift.loc[name, name] = np.nan
+    fig = px.imshow(lift.round(2), title='Cuisines Served Together (lift)', color_continuous_scale='viridis',
+                    height=700, width=900)
+    fig.update_layout(xaxis=dict(title=''), yaxis=dict(title=''))
+    return fig
+
+
+# 4. Rating and votes
+
+def scatter_mode(data, mode='Auto'):
+    # Above SCATTER_THRESHOLD rows the raw scatter becomes several MB of JSON, so Auto bins it server-side
+    if mode == 'Auto':
+        return 'Density' if data.cube['count'].sum() > SCATTER_THRESHOLD else 'All points'
+    return mode
+
+
+def rating_scatter(data, x, title, mode):
+    if data.frame is None:
+        return heatmap_figure(data.densities[x], x, 'rate', 'votes', title)
+    mode = scatter_mode(data, mode)
+    if mode == 'Density':
+        return density_figure(data.rows, x, 'rate', 'votes', title)
+    if mode == 'WebGL sample':
+        return sampled_scatter_figure(data.rows, x, 'rate', 'votes', title)
+    return px.scatter(data.rows, x=x, y='rate', color='votes', color_continuous_scale='plasma', title=title)
+
+
+def rating_vs_votes(data, mode='Auto'):
+    fig = rating_scatter(data, 'votes', ' Restaurant Rating vs Votes', mode)
+    fig.update_layout(yaxis = dict(title = 'Rating'))
+    return fig
+
+
+def rating_vs_cost(data, mode='Auto'):
+    fig = rating_scatter(data, 'avg_cost_per_plate', ' Restaurant Rating vs Avg. cost per plate', mode)
+    fig.update_layout(xaxis=dict(title='avgerage cost per plate'), yaxis=dict(title='Rating'))
+    return fig
+
+
+def vote_category_by_rest_type(data):
+    temp = crosstab(data.cube, 'vote_category', 'rest_type')
+    fig = px.bar(temp, x= temp.index, y = temp.columns , barmode = 'group',title = 'Vote Category vs Restaurant type')
+    fig.update_layout(xaxis=dict(title= 'vote category'), yaxis=dict(title= 'Restaurant type'))
+    return fig
+
+
+# 5. Restaurant type
+
+def cost_by_rest_type(data):
+    temp = without_others(rollup(data.cube, 'rest_type')['avg_cost_per_plate'].round().sort_values(ascending=False).reset_index(), 'rest_type')
+    fig = px.bar(temp, x='rest_type', y='avg_cost_per_plate', color='rest_type', text_auto=True, title='Average cost per plate on different Restaurant type')
+    fig.update_layout(yaxis = dict(title = 'Average cost per plate'), xaxis = dict(title = 'Restaurant Type'))
+    return fig
+
+
+def rate_by_rest_type(data):
+    temp = without_others(rollup(data.cube, 'rest_type')['rate'].round(2).sort_values(ascending=False).reset_index(), 'rest_type')
+    fig = px.bar(temp, x='rest_type', y='rate', color='rest_type', text_auto=True,title='Average Rating of different Restaurant type')
+    fig.update_layout(xaxis=dict(title='Restaurant Type'))
+    return fig
+
+
+def votes_by_rest_type(data):
+    temp = without_others(rollup(data.cube, 'rest_type')['votes'].round(2).sort_values(ascending=False).reset_index(), 'rest_type')
+    fig = px.bar(temp, x='rest_type', y='votes', color='rest_type', text_auto=True,title='Average Voting of different Restaurant type')
+    fig.update_layout(xaxis=dict(title='Restaurant Type'))
+    return fig
+
+
+# Chart spec id -> builder, in page order
+CHARTS = {f.__name__: f for f in [
+    top_restaurants, crowded_locations, online_order_share, book_table_share,
+    online_order_by_location, online_order_treemap, book_table_treemap, online_order_by_rest_type,
+    book_table_by_location, cost_by_location, cost_category_by_location, votes_by_location, rate_by_location,
+    rest_type_by_location, neighborhood_similarity,
+    cuisines_by_online_order, cuisines_by_book_table, less_crowded_cuisines, more_crowded_cuisines,
+    cuisines_by_rest_type, cuisines_by_rate_and_vote, cuisine_counts, cuisine_cooccurrence,
+    rating_vs_votes, rating_vs_cost, vote_category_by_rest_type,
+    cost_by_rest_type, rate_by_rest_type, votes_by_rest_type,
+]}
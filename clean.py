@@ -0,0 +1,143 @@
+import argparse
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data import YES_NO, apply_schema, sidecar_path, write_sidecar
+
+# Raw Kaggle column -> cleaned column. location is the listing's city area (listed_in(city), 30 values), not
+# the raw neighborhood column
+RAW_COLUMNS = {
+    'name': 'name',
+    'online_order': 'online_order',
+    'book_table': 'book_table',
+    'rate': 'rate',
+    'votes': 'votes',
+    'rest_type': 'rest_type',
+    'cuisines': 'cuisines',
+    'approx_cost(for two people)': 'cost2plates',
+    'listed_in(type)': 'type',
+    'listed_in(city)': 'location',
+}
+# Rate placeholders of unrated listings; they get the mean rate like missing ones
+MISSING_RATES = ['NEW', '-']
+# Whole values (e.g. a full cuisine list) with fewer listings than this become 'others'
+RARE = {'rest_type': 1000, 'cuisines': 100}
+# Bytes of raw csv per pool task
+PART_BYTES = 64 * 2**20
+QUOTE, NEWLINE = ord('"'), ord('\n')
+
+
+def split_points(path, part_bytes=PART_BYTES, block=PART_BYTES):
+    # Row starts splitting the file into parts of about part_bytes. Reviews and menus hold newlines inside
+    # quoted fields, so a newline only ends a row where the quotes before it are balanced: the quote count is
+    # kept per block of the memory-mapped file, and only a window after each cut is searched for newlines
+    data = np.memmap(path, dtype='uint8', mode='r')
+    size = len(data)
+    header_end = int(np.flatnonzero(data[:1 << 20] == NEWLINE)[0]) + 1
+    quotes = [np.count_nonzero(data[start:start + block] == QUOTE) for start in range(0, size, block)]
+    before = np.concatenate([[0], np.cumsum(quotes)])
+
+    points = [header_end]
+    for target in range(header_end + part_bytes, size, part_bytes):
+        if target <= points[-1]:
+            continue
+        parity = before[target // block] + np.count_nonzero(data[target // block * block:target] == QUOTE)
+        start = target
+        while start < size:
+            window = data[start:start + (1 << 20)]
+            is_quote = window == QUOTE
+            open_quotes = (parity + np.cumsum(is_quote)) % 2
+            ends = np.flatnonzero((window == NEWLINE) & (open_quotes == 0))
+            if len(ends):
+                points.append(start + int(ends[0]) + 1)
+                break
+            parity += np.count_nonzero(is_quote)
+            start += len(window)
+    if points[-1] < size:
+        points.append(size)
+    return points
+
+
+def header(path):
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+
+def parse_rate(rate):
+    # '4.1/5', '3.9 /5', 'NEW', '-' or missing -> float, NaN when unrated
+    rate = rate.str.split('/', n=1).str[0].str.strip()
+    return pd.to_numeric(rate.mask(rate.isin(MISSING_RATES)), errors='coerce')
+
+
+def clean_part(path, start, end, names):
+    # One part of the raw csv -> its cleaned rows (rates not yet filled) and the counts the collapse needs
+    with open(path, 'rb') as f:
+        f.seek(start)
+        raw = f.read(end - start)
+    df = pd.read_csv(io.BytesIO(raw), header=None, names=names, usecols=list(RAW_COLUMNS), dtype=str)
+    df = df.rename(columns=RAW_COLUMNS)[list(RAW_COLUMNS.values())]
+    # Names keep their raw spelling (a few start with a space in the published csv)
+    for column in ['online_order', 'book_table', 'rest_type', 'cuisines', 'type', 'location']:
+        df[column] = df[column].str.strip()
+    df['rate'] = parse_rate(df['rate'])
+    df['cost2plates'] = pd.to_numeric(df['cost2plates'].str.replace(',', '', regex=False), errors='coerce')
+    df['votes'] = pd.to_numeric(df['votes'], errors='coerce')
+    df = df.dropna(subset=[column for column in df.columns if column != 'rate'])
+    counts = {column: df[column].value_counts() for column in RARE}
+    return df, counts
+
+
+def collapse_rare(values, counts, threshold):
+    rare = counts.index[counts < threshold]
+    return values.mask(values.isin(rare), 'others')
+
+
+def clean_dataset(path, workers=None, part_bytes=PART_BYTES):
+    # Raw Kaggle csv -> cleaned frame in the declared SCHEMA (see data.py). Parts are parsed and cleaned in a
+    # process pool; what needs the whole dataset (the mean rate, rare value counts, duplicates) is combined here
+    points = split_points(path, part_bytes)
+    names = header(path)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(clean_part, [path] * (len(points) - 1), points[:-1], points[1:],
+                              [names] * (len(points) - 1)))
+    df = pd.concat([part for part, _ in parts], ignore_index=True)
+
+    # Unrated listings get the mean rating; rates are then truncated to whole stars like the published csv
+    df['rate'] = df['rate'].fillna(df['rate'].mean()).astype('int64')
+    for column, threshold in RARE.items():
+        counts = pd.concat([part_counts[column] for _, part_counts in parts]).groupby(level=0).sum()
+        df[column] = collapse_rare(df[column], counts, threshold)
+    df = df.drop_duplicates(ignore_index=True)
+    return apply_schema(df)
+
+
+def write_cleaned(df, out):
+    # The csv the dashboard and notebook read, plus its typed sidecar so the first load skips parsing it
+    plain = df.assign(**{column: df[column].map(YES_NO) for column in ['online_order', 'book_table']})
+    plain.astype({'rate': 'int64'}).to_csv(out, index=False)
+    try:
+        write_sidecar(df, sidecar_path(out))
+    except (OSError, ImportError):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Clean the raw Kaggle Zomato Bangalore csv into zomato_cleaned.csv.')
+    parser.add_argument('raw', help='raw zomato.csv from Kaggle')
+    parser.add_argument('--out', default='zomato_cleaned.csv')
+    parser.add_argument('--workers', type=int, default=None, help='cleaning processes (default: cpu count)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = clean_dataset(args.raw, args.workers)
+    write_cleaned(df, args.out)
+    print(f'{len(df):,} listings written to {args.out} in {time.perf_counter() - start:.1f}s '
+          f'({os.path.getsize(args.raw) / 2**20:,.0f} MB raw)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Itemsets rarer than this share of listings are not reported
+MIN_SUPPORT = 0.005
+SEPARATOR = ' + '
+
+
+def token_matrix(index, exclude=('others',)):
+    # Multi-hot rows x cuisine matrix of a CuisineIndex without the excluded tokens, as float csc
+    keep = ~index.vocabulary.isin(exclude)
+    return index.matrix[:, np.flatnonzero(keep)].astype('float64').tocsc(), index.vocabulary[keep]
+
+
+def cooccurrence(index, weights, exclude=('others',)):
+    # cuisine x cuisine listing counts as one sparse product M.T @ diag(w) @ M; the diagonal holds
+    # the listings serving each cuisine
+    matrix, vocabulary = token_matrix(index, exclude)
+    counts = (matrix.T @ sparse.diags(np.asarray(weights, dtype='float64')) @ matrix).toarray()
+    return pd.DataFrame(counts.round().astype('int64'), index=vocabulary, columns=vocabulary)
+
+
+def itemsets(index, weights, size=2, min_support=MIN_SUPPORT, exclude=('others',)):
+    # Frequent cuisine pairs (size 2) or triples (size 3) with their count, support and lift, most
+    # frequent first. Triples are counted per anchor cuisine (one sparse product per cuisine, not
+    # per row), and only from cuisines frequent enough to be part of a frequent triple
+    weights = np.asarray(weights, dtype='float64')
+    total = weights.sum()
+    matrix, vocabulary = token_matrix(index, exclude)
+    singles = matrix.T @ weights
+    frequent = np.flatnonzero(singles >= min_support * total)
+    weighted = sparse.diags(weights) @ matrix
+
+    if size == 2:
+        counts = (matrix.T @ weighted).toarray()
+        i, j = np.triu_indices(len(vocabulary), k=1)
+        members, count = [i, j], counts[i, j]
+    elif size == 3:
+        members, count = [[], [], []], []
+        for anchor in frequent:
+            # Listings serving the anchor, as weights; pairs above the anchor complete the triple
+            rows = weighted[:, anchor].toarray().ravel()
+            pairs = (matrix.T @ sparse.diags(rows) @ matrix).toarray()
+            j, k = np.triu_indices(len(vocabulary), k=1)
+            above = j > anchor
+            members[0].append(np.full(above.sum(), anchor))
+            members[1].append(j[above])
+            members[2].append(k[above])
+            count.append(pairs[j[above], k[above]])
+        members = [np.concatenate(m) if m else np.array([], dtype='int64') for m in members]
+        count = np.concatenate(count) if count else np.array([])
+    else:
+        raise ValueError(f'itemsets supports sizes 2 and 3, got {size}')
+
+    keep = count >= max(min_support * total, 1)
+    members, count = [m[keep] for m in members], count[keep]
+    expected = np.prod([singles[m] / total for m in members], axis=0) if len(count) else np.array([])
+    table = pd.DataFrame({
+        'cuisines': [SEPARATOR.join(names) for names in zip(*(vocabulary[m] for m in members))],
+        'count': count.round().astype('int64'),
+        'support': count / total,
+        'lift': (count / total) / np.where(expected > 0, expected, np.nan),
+    })
+    return table.sort_values(['count', 'lift'], ascending=False, ignore_index=True)
+
+
+def itemset_breakdown(index, weights, labels, table, top=10, exclude=('others',)):
+    # Support of the `top` itemsets of `table` within every group of `labels` (e.g. location):
+    # listings serving all members, as one sparse product per itemset size
+    matrix, vocabulary = token_matrix(index, exclude)
+    names = table['cuisines'][:top].str.split(SEPARATOR, regex=False)
+    members = [vocabulary.get_indexer(names.str[position]) for position in range(names.str.len().max())]
+    serves = matrix[:, members[0]]
+    for m in members[1:]:
+        serves = serves.multiply(matrix[:, m])
+
+    codes, groups = pd.factorize(labels, sort=True)
+    keep = codes >= 0
+    weights = np.asarray(weights, dtype='float64')
+    onehot = sparse.csr_matrix((weights[keep], (codes[keep], np.flatnonzero(keep))), shape=(len(groups), len(codes)))
+    counts = np.asarray((onehot @ sparse.csc_matrix(serves)).todense())
+    totals = np.asarray(onehot.sum(axis=1)).ravel()
+    shares = counts / np.where(totals > 0, totals, 1)[:, None]
+    result = pd.DataFrame(shares, index=pd.Index(groups, name=labels.name), columns=table['cuisines'][:top])
+    return result.loc[totals > 0]
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from aggregates import normalize_table
+
+
+class CuisineIndex:
+    # Token level view of the comma-joined `cuisines` column:
+    #   vocabulary - sorted distinct cuisines
+    #   matrix     - rows x vocabulary multi-hot csr matrix
+    #   postings   - the same matrix as csc, i.e. cuisine -> row ids (inverted index)
+
+    def __init__(self, cuisines):
+        cuisines = cuisines.astype('category')
+        combos = pd.Series(cuisines.cat.categories)
+
+        # Tokenize the distinct combinations only; rows just point at their combination
+        tokens = combos.str.split(',').explode().str.strip()
+        token_ids, vocabulary = pd.factorize(tokens, sort=True)
+        self.vocabulary = pd.Index(vocabulary, name='cuisines')
+        combo_matrix = sparse.csr_matrix(
+            (np.ones(len(tokens), dtype='uint8'), (tokens.index.to_numpy(), token_ids)),
+            shape=(len(combos) + 1, len(self.vocabulary)))
+        combo_matrix.data[:] = 1  # a combination listing a cuisine twice still serves it once
+
+        # Missing cuisines (code -1) land on the trailing empty row
+        codes = cuisines.cat.codes.to_numpy()
+        self.matrix = combo_matrix[np.where(codes < 0, len(combos), codes)]
+        self.postings = self.matrix.tocsc()
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def rows(self, cuisine):
+        j = self.vocabulary.get_loc(cuisine)
+        return self.postings.indices[self.postings.indptr[j]:self.postings.indptr[j + 1]]
+
+    def mask(self, cuisine):
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.rows(cuisine)] = True
+        return mask
+
+    def counts(self, weights=None):
+        weights = np.ones(len(self), dtype='int64') if weights is None else np.asarray(weights)
+        return pd.Series(self.matrix.T @ weights, index=self.vocabulary, name='count')
+
+    def crosstab(self, labels, weights=None, normalize=False, exclude=('others',)):
+        # labels x cuisine counts as one sparse product: one-hot(labels).T @ multi-hot(cuisines)
+        codes, groups = pd.factorize(labels, sort=True)
+        keep = codes >= 0
+        weights = np.ones(len(self), dtype='int64') if weights is None else np.asarray(weights)
+        onehot = sparse.csr_matrix((weights[keep], (codes[keep], np.flatnonzero(keep))),
+                                   shape=(len(groups), len(self)))
+        table = pd.DataFrame((onehot @ self.matrix).toarray(), index=pd.Index(groups, name=labels.name),
+                             columns=self.vocabulary)
+        table = table.drop(columns=[c for c in exclude if c in table.columns])
+        table = table.loc[table.sum(axis=1) > 0, table.sum(axis=0) > 0]
+        return normalize_table(table, normalize)
@@ -0,0 +1,145 @@
+import hashlib
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+DATA_PATH = 'zomato_cleaned.csv'
+SIDECAR_DIR = '.cache'
+# Bump whenever SCHEMA changes so old sidecars are not read back with stale dtypes
+SCHEMA_VERSION = 1
+
+# Declared in-memory schema of the cleaned dataset
+SCHEMA = {
+    'name': 'category',
+    'online_order': 'bool',
+    'book_table': 'bool',
+    'rate': 'float32',
+    'votes': 'int32',
+    'rest_type': 'category',
+    'cuisines': 'category',
+    'cost2plates': 'int16',
+    'type': 'category',
+    'location': 'category',
+}
+FLAG_COLUMNS = ['online_order', 'book_table']
+YES_NO = {True: 'Yes', False: 'No'}
+LEVELS = pd.CategoricalDtype(['low', 'mid', 'high'], ordered=True)
+
+
+def file_fingerprint(path):
+    # Cheap stat based key: changes whenever the csv is rewritten, costs nothing per rerun
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+def content_hash(path):
+    digest = hashlib.blake2b(digest_size=10)
+    digest.update(f'schema-v{SCHEMA_VERSION}'.encode())
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sidecar_path(path):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    folder = os.path.join(os.path.dirname(os.path.abspath(path)), SIDECAR_DIR)
+    return os.path.join(folder, f'{stem}-{content_hash(path)}.parquet')
+
+
+def read_dataset(path=DATA_PATH, sidecar=None):
+    # The sidecar is named after the csv content, so an edited csv never reads a stale parquet. Naming it
+    # hashes the whole csv, so callers that need the name too compute it once and pass it in
+    sidecar = sidecar or sidecar_path(path)
+    if os.path.exists(sidecar):
+        return pd.read_parquet(sidecar)
+
+    df = apply_schema(pd.read_csv(path))
+    try:
+        write_sidecar(df, sidecar)
+    except (OSError, ImportError):
+        # Read-only deployments or a missing parquet engine only cost a csv parse per cold start
+        pass
+    return df
+
+
+def current_names(sidecar):
+    # Everything the current version of a csv keeps in the cache folder: its sidecar, the aggregates of the
+    # current cube layout, their streamed variant and appended listings (plus the .tmp / .old names used while they are rewritten)
+    from aggregates import aggregates_folder
+
+    names = [sidecar, *[aggregates_folder(sidecar) + suffix for suffix in ['', '-stream', '-appended']]]
+    return {os.path.basename(name) + suffix for name in names for suffix in ['', '.tmp', '.old']}
+
+
+def remove_stale(sidecar):
+    # Sidecars of earlier versions of the same csv, and everything derived from them (e.g. aggregates),
+    # including aggregates of an earlier cube layout of the current version
+    folder = os.path.dirname(sidecar)
+    os.makedirs(folder, exist_ok=True)
+    prefix = os.path.basename(sidecar).rsplit('-', 1)[0] + '-'
+    current = current_names(sidecar)
+    for old in os.listdir(folder):
+        if not old.startswith(prefix) or old in current:
+            continue
+        old = os.path.join(folder, old)
+        if os.path.isdir(old):
+            shutil.rmtree(old)
+        else:
+            os.remove(old)
+
+
+def write_sidecar(df, sidecar):
+    remove_stale(sidecar)
+    tmp = sidecar + '.tmp'
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, sidecar)
+
+
+def check_listings(df):
+    # Raises ValueError naming the first thing keeping df (cleaned csv layout) from apply_schema, e.g. a missing
+    # column or a raw rate like '4.1/5'
+    if df.empty:
+        raise ValueError('no listings')
+    missing = [column for column in SCHEMA if column not in df]
+    if missing:
+        raise ValueError(f'missing columns: {", ".join(missing)}')
+    for column in FLAG_COLUMNS:
+        if df[column].dtype != bool and not df[column].isin(list(YES_NO.values())).all():
+            raise ValueError(f'{column} must be Yes or No')
+    for column, dtype in SCHEMA.items():
+        if dtype in ('category', 'bool'):
+            continue
+        limits = np.finfo(dtype) if dtype.startswith('float') else np.iinfo(dtype)
+        values = pd.to_numeric(df[column], errors='coerce')
+        bad = ~values.between(limits.min, limits.max)
+        if bad.any():
+            raise ValueError(f'{column} must be a number within the {dtype} range, got {df[column][bad].iloc[0]!r}')
+
+
+def apply_schema(df):
+    for column in FLAG_COLUMNS:
+        if column in df and df[column].dtype != bool:
+            df[column] = df[column].eq('Yes')
+    return df.astype({k: v for k, v in SCHEMA.items() if k in df})
+
+
+def memory_footprint(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def untyped_footprint(df):
+    # What the same frame costs with plain read_csv dtypes (object strings and 64 bit numbers)
+    raw = {}
+    for column, dtype in df.dtypes.items():
+        if dtype == bool:
+            raw[column] = df[column].map(YES_NO).astype(object)
+        elif isinstance(dtype, pd.CategoricalDtype):
+            raw[column] = df[column].astype(object)
+        elif pd.api.types.is_integer_dtype(dtype):
+            raw[column] = df[column].astype('int64')
+        else:
+            raw[column] = df[column].astype('float64')
+    return memory_footprint(pd.DataFrame(raw))
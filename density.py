@@ -0,0 +1,83 @@
+import numpy as np
+import plotly.graph_objects as go
+
+# Above this many points the scatter plots switch to a server-side binned view
+SCATTER_THRESHOLD = 20_000
+BINS = (60, 40)
+SAMPLE_SIZE = 5_000
+
+
+def range_edges(low, high, integral, bins):
+    # Integer-valued columns with few distinct values (e.g. rate) get one bin per value
+    low, high = float(low), float(high)
+    if high - low + 1 <= bins and integral:
+        return np.arange(low - 0.5, high + 1.5)
+    return np.linspace(low, high, bins + 1) if high > low else np.array([low - 0.5, low + 0.5])
+
+
+def bin_edges(values, bins):
+    return range_edges(values.min(), values.max(), np.array_equal(values, np.round(values)), bins)
+
+
+def binned_totals(x, y, color, x_edges, y_edges):
+    # Count and `color` total per (x, y) bin; totals of several chunks simply add up
+    x, y, color = (np.asarray(v, dtype='float64') for v in (x, y, color))
+    counts, _, _ = np.histogram2d(x, y, bins=(x_edges, y_edges))
+    totals, _, _ = np.histogram2d(x, y, bins=(x_edges, y_edges), weights=color)
+    return counts, totals
+
+
+def density_grid(x_edges, y_edges, counts, totals):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = totals / counts
+    centers = [(edges[:-1] + edges[1:]) / 2 for edges in (x_edges, y_edges)]
+    return centers[0], centers[1], counts.T, means.T
+
+
+def binned_density(x, y, color, bins=BINS):
+    # Count and mean `color` per (x, y) bin; output size only depends on `bins`
+    x, y = np.asarray(x, dtype='float64'), np.asarray(y, dtype='float64')
+    x_edges, y_edges = bin_edges(x, bins[0]), bin_edges(y, bins[1])
+    return density_grid(x_edges, y_edges, *binned_totals(x, y, color, x_edges, y_edges))
+
+
+def stratified_sample(x, y, size=SAMPLE_SIZE, bins=BINS, seed=0):
+    # Row positions of a sample that caps every (x, y) bin, so sparse regions and outliers survive
+    x, y = np.asarray(x, dtype='float64'), np.asarray(y, dtype='float64')
+    if len(x) <= size:
+        return np.arange(len(x))
+    x_edges, y_edges = bin_edges(x, bins[0]), bin_edges(y, bins[1])
+    x_bin = np.clip(np.searchsorted(x_edges, x, side='right') - 1, 0, len(x_edges) - 2)
+    y_bin = np.clip(np.searchsorted(y_edges, y, side='right') - 1, 0, len(y_edges) - 2)
+    cells = x_bin * (len(y_edges) - 1) + y_bin
+
+    shuffled = np.random.default_rng(seed).permutation(len(x))
+    order = shuffled[np.argsort(cells[shuffled], kind='stable')]
+    sorted_cells = cells[order]
+    starts = np.flatnonzero(np.r_[True, sorted_cells[1:] != sorted_cells[:-1]])
+    rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    cap = max(1, size // len(starts))
+    return np.sort(order[rank < cap])
+
+
+def density_figure(df, x, y, color, title):
+    return heatmap_figure(binned_density(df[x], df[y], df[color]), x, y, color, title)
+
+
+def heatmap_figure(grid, x, y, color, title):
+    x_centers, y_centers, counts, means = grid
+    fig = go.Figure(go.Heatmap(
+        x=x_centers, y=y_centers, z=np.where(counts > 0, counts, np.nan).astype('float32'),
+        customdata=np.round(means, 1).astype('float32'), colorscale='plasma', colorbar=dict(title='restaurants'),
+        hovertemplate=f'{x}: %{{x:.0f}}<br>{y}: %{{y}}<br>restaurants: %{{z}}<br>mean {color}: %{{customdata}}<extra></extra>'))
+    fig.update_layout(title=title, xaxis=dict(title=x), yaxis=dict(title=y))
+    return fig
+
+
+def sampled_scatter_figure(df, x, y, color, title):
+    sample = df.iloc[stratified_sample(df[x], df[y])]
+    fig = go.Figure(go.Scattergl(x=sample[x], y=sample[y], mode='markers',
+                                 marker=dict(color=sample[color], colorscale='plasma', showscale=True,
+                                             colorbar=dict(title=color), size=5)))
+    fig.update_layout(title=f'{title} ({len(sample):,} of {len(df):,} points)', xaxis=dict(title=x), yaxis=dict(title=y))
+    return fig
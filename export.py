@@ -0,0 +1,57 @@
+import gzip
+import io
+
+import numpy as np
+
+from data import FLAG_COLUMNS, YES_NO
+
+# label: (file extension, mime type)
+FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'CSV (gzip)': ('csv.gz', 'application/gzip'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+CHUNK_ROWS = 100_000
+
+
+def chunks(df, rows=None, size=CHUNK_ROWS):
+    # rows: positions to export (None for all); only one chunk is materialized at a time
+    positions = np.arange(len(df)) if rows is None else np.asarray(rows)
+    for start in range(0, len(positions), size):
+        yield df.iloc[positions[start:start + size]]
+
+
+def write_csv(df, handle, rows=None):
+    # The header goes first on its own, so an empty selection still exports the column names
+    df.iloc[:0].to_csv(handle, index=False)
+    for chunk in chunks(df, rows):
+        # Flags go back to the Yes/No of the source csv
+        chunk = chunk.assign(**{c: chunk[c].map(YES_NO) for c in FLAG_COLUMNS if c in chunk})
+        chunk.to_csv(handle, header=False, index=False)
+
+
+def write_parquet(df, handle, rows=None):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # The schema comes from the columns, not the first chunk, so an empty selection is still a valid file
+    schema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+    with pq.ParquetWriter(handle, schema) as writer:
+        for chunk in chunks(df, rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def export_bytes(df, fmt, rows=None):
+    buffer = io.BytesIO()
+    if fmt == 'Parquet':
+        write_parquet(df, buffer, rows)
+    elif fmt == 'CSV (gzip)':
+        with gzip.GzipFile(fileobj=buffer, mode='wb') as compressed, \
+                io.TextIOWrapper(compressed, encoding='utf-8', newline='') as text:
+            write_csv(df, text, rows)
+    else:
+        text = io.TextIOWrapper(buffer, encoding='utf-8', newline='')
+        write_csv(df, text, rows)
+        text.flush()
+        text.detach()  # keep the buffer open
+    return buffer.getvalue()
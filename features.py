@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from data import LEVELS
+
+QUARTILES = (0.25, 0.75)
+# source column, derived category, position of the category column
+CATEGORIES = [('rate', 'rate_category', 4), ('votes', 'vote_category', 6), ('avg_cost_per_plate', 'cost_category', 12)]
+
+
+def quantile_breakpoints(values, quantiles=QUARTILES):
+    # Same linear interpolation as Series.quantile
+    values = np.asarray(values, dtype='float64')
+    return np.nanquantile(values, quantiles)
+
+
+def counted_quantiles(counts, quantiles=QUARTILES):
+    # quantile_breakpoints from a value -> count table (e.g. summed over csv chunks) instead of the values
+    counts = counts[counts > 0].sort_index()
+    values, cumulative = counts.index.to_numpy('float64'), np.cumsum(counts.to_numpy())
+    positions = (cumulative[-1] - 1) * np.asarray(quantiles, dtype='float64')
+    lower = values[np.searchsorted(cumulative, np.floor(positions), side='right')]
+    upper = values[np.searchsorted(cumulative, np.ceil(positions), side='right')]
+    return lower + (positions - np.floor(positions)) * (upper - lower)
+
+
+def bucketize(values, quantiles=QUARTILES, breakpoints=None, labels=None):
+    # Buckets are [-inf, b0), [b0, b1), ..., [b(n-2), b(n-1)], (b(n-1), inf): the top inner edge is
+    # closed so two quartiles reproduce the old low / mid / high rule (x < lower, lower <= x <= upper, else)
+    values = np.asarray(values, dtype='float64')
+    if breakpoints is None:
+        breakpoints = quantile_breakpoints(values, quantiles)
+    breakpoints = np.sort(np.asarray(breakpoints, dtype='float64'))
+    if not len(breakpoints):
+        raise ValueError('bucketize needs at least one breakpoint')
+
+    if labels is None:
+        labels = LEVELS.categories if len(breakpoints) == 2 else [f'b{i}' for i in range(len(breakpoints) + 1)]
+    if len(labels) != len(breakpoints) + 1:
+        raise ValueError(f'{len(breakpoints)} breakpoints need {len(breakpoints) + 1} labels, got {len(labels)}')
+
+    codes = np.searchsorted(breakpoints[:-1], values, side='right') + (values > breakpoints[-1])
+    codes[np.isnan(values)] = -1
+    dtype = LEVELS if list(labels) == list(LEVELS.categories) else pd.CategoricalDtype(labels, ordered=True)
+    return pd.Categorical.from_codes(codes, dtype=dtype), breakpoints
+
+
+def cost_per_plate(df):
+    num_cuisines = df['cuisines'].str.count(',') + 1
+    return round(df['cost2plates'] / num_cuisines).astype('int16')
+
+
+def add_features(df, breakpoints=None):
+    # Returns the cut-points used for each derived category so the page can show them;
+    # given cut-points (e.g. from a first pass over a chunked csv) are applied instead of computed
+    df.insert(9, 'avg_cost_per_plate', cost_per_plate(df))
+
+    breakpoints = dict(breakpoints or {})
+    for source, target, position in CATEGORIES:
+        category, breakpoints[target] = bucketize(df[source], breakpoints=breakpoints.get(target))
+        df.insert(position, target, category)
+
+    df.drop(columns='cost2plates', inplace=True)
+    return breakpoints
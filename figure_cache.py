@@ -0,0 +1,89 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+
+try:
+    # plotly imports orjson lazily on first use, which is not safe when figures are built from several threads
+    import orjson  # noqa: F401
+except ImportError:
+    pass
+
+# Memory budget of the in-process tier and optional folder for the on-disk tier
+BUDGET_MB = float(os.environ.get('FIGURE_CACHE_MB', 64))
+CACHE_DIR = os.environ.get('FIGURE_CACHE_DIR')
+
+
+def figure_key(fingerprint, filter_state, spec_id, options=None):
+    # Content address of a figure: dataset version + active filters + chart spec (+ its options)
+    text = repr((fingerprint, filter_state, spec_id, sorted((options or {}).items())))
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+class FigureCache:
+    # Serialized figure JSON, LRU-evicted once the stored bytes exceed max_bytes;
+    # evicted or cold entries are still found in `folder` when one is given
+
+    def __init__(self, max_bytes=BUDGET_MB * 2**20, folder=CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.folder = folder
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = self.misses = 0
+        self.lock = threading.Lock()
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.folder, f'{key}.json')
+
+    def get(self, key):
+        with self.lock:
+            spec = self.entries.get(key)
+            if spec is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return spec
+        if self.folder and os.path.exists(self.path(key)):
+            with open(self.path(key), encoding='utf-8') as f:
+                spec = f.read()
+            self.put(key, spec, persist=False)
+            with self.lock:
+                self.hits += 1
+            return spec
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, spec, persist=True):
+        with self.lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key))
+            self.entries[key] = spec
+            self.size += len(spec)
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+        if persist and self.folder:
+            tmp = self.path(key) + f'.{threading.get_ident()}.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(spec)
+            os.replace(tmp, self.path(key))
+
+    def figure(self, key, build):
+        # Cached figures come back from JSON without redoing the pandas work or the plotly express build
+        spec = self.get(key)
+        if spec is None:
+            fig = build()
+            self.put(key, fig.to_json())
+            return fig
+        return pio.from_json(spec, skip_invalid=True)
+
+    def warm(self, fingerprint, filter_state, builders, data):
+        # Pre-builds every chart for one dataset version / filter state, e.g. right after server start
+        for spec_id, build in builders.items():
+            key = figure_key(fingerprint, filter_state, spec_id)
+            if self.get(key) is None:
+                self.put(key, build(data).to_json())
@@ -0,0 +1,36 @@
+import numpy as np
+
+FILTER_COLUMNS = ['location', 'rest_type', 'type', 'online_order', 'book_table']
+RANGE_COLUMNS = ['avg_cost_per_plate', 'rate']
+
+
+def build_bitmasks(df, columns=FILTER_COLUMNS):
+    # One packed bitmap (1 bit per row) for every value of every filterable column
+    bitmasks = {}
+    for column in columns:
+        values = df[column]
+        codes, uniques = (values.cat.codes.to_numpy(), values.cat.categories) if hasattr(values, 'cat') \
+            else (values.to_numpy().astype('int8'), [False, True])
+        bitmasks[column] = {value: np.packbits(codes == code) for code, value in enumerate(uniques)}
+    return bitmasks
+
+
+def select(bitmasks, n_rows, selections=None, ranges=None, frame=None):
+    # selections: {column: [values]} - values of one column are OR-ed, columns are AND-ed.
+    # ranges: {column: (low, high)} checked inclusively on `frame`.
+    # Returns a boolean row mask, or None when nothing is filtered.
+    combined = None
+    for column, values in (selections or {}).items():
+        if not values or len(values) == len(bitmasks[column]):
+            continue
+        either = np.bitwise_or.reduce([bitmasks[column][value] for value in values])
+        combined = either if combined is None else combined & either
+
+    mask = None if combined is None else np.unpackbits(combined, count=n_rows).view(bool)
+    for column, (low, high) in (ranges or {}).items():
+        values = frame[column].to_numpy()
+        if low <= values.min() and high >= values.max():
+            continue
+        within = (values >= low) & (values <= high)
+        mask = within if mask is None else mask & within
+    return mask
@@ -0,0 +1,115 @@
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from aggregates import normalize_table
+from similarity import cosine, spectral_order
+
+# Rows / columns a heatmap keeps, by total count; the rest are summed into one trailing OTHER row / column
+TOP_ROWS = 30
+TOP_COLUMNS = 30
+OTHER = 'other'
+# Bytes of z values and axis labels one heatmap may ship; above it fewer rows and columns are kept
+PAYLOAD_BUDGET = 48 * 2**10
+
+
+def keep_top(labels, totals, top, other):
+    # Positions of the top - 1 labels by total, in their original order, and the axis labels after folding
+    # the rest into one `other (n)` label; None when nothing needs folding
+    if top is None or len(labels) <= top:
+        return None, labels
+    kept = np.sort(np.argsort(-totals, kind='stable')[:max(top - 1, 1)])
+    folded = len(labels) - len(kept)
+    return kept, pd.Index([str(label) for label in labels[kept]] + [f'{other} ({folded})'], name=labels.name)
+
+
+def fold(values, kept, axis):
+    # values with the positions outside kept summed into one trailing row (axis 0) or column (axis 1)
+    if kept is None:
+        return values
+    rest = np.delete(values, kept, axis=axis).sum(axis=axis, keepdims=True)
+    return np.concatenate([np.take(values, kept, axis=axis), rest], axis=axis)
+
+
+def collapse(table, rows=TOP_ROWS, columns=TOP_COLUMNS, other=OTHER):
+    # Counts table -> at most rows x columns, the smallest rows / columns summed into `other`; None keeps an
+    # axis whole. Fold counts, not shares: normalize afterwards so `other` gets the share of what it holds
+    values = table.to_numpy()
+    row_kept, index = keep_top(table.index, values.sum(axis=1), rows, other)
+    column_kept, labels = keep_top(table.columns, values.sum(axis=0), columns, other)
+    values = fold(fold(values, row_kept, 0), column_kept, 1)
+    return pd.DataFrame(values, index=index, columns=labels)
+
+
+def order(table, axis, method):
+    # Positions sorting one axis: by total ('mass', largest first) or with similar profiles next to each other
+    # ('cluster'); a folded `other` row / column stays last
+    values = table.to_numpy('float64') if axis == 0 else table.to_numpy('float64').T
+    labels = table.index if axis == 0 else table.columns
+    folded = len(labels) > 0 and str(labels[-1]).startswith(f'{OTHER} (')
+    n = len(labels) - folded
+    if method == 'mass':
+        positions = np.argsort(-values[:n].sum(axis=1), kind='stable')
+    else:
+        positions = spectral_order(pd.DataFrame(cosine(values[:n])))
+    return np.concatenate([positions, np.arange(n, len(labels))]).astype('int64')
+
+
+def reorder(table, rows=None, columns=None):
+    # rows / columns: None keeps the axis order (ordinal categories), 'mass' or 'cluster'
+    if rows is not None:
+        table = table.iloc[order(table, 0, rows)]
+    if columns is not None:
+        table = table.iloc[:, order(table, 1, columns)]
+    return table
+
+
+def compact(table, decimals=0):
+    # The z matrix as int32 when rounded to whole numbers, float32 otherwise; either way each cell goes out as
+    # a short JSON number instead of a float64 repr
+    if decimals == 0:
+        return np.rint(table.to_numpy('float64')).astype('int32')
+    return table.to_numpy('float64').round(decimals).astype('float32')
+
+
+def payload_bytes(table, decimals=0):
+    labels = [str(label) for label in [*table.index, *table.columns]]
+    return len(json.dumps(compact(table, decimals).tolist())) + len(json.dumps(labels))
+
+
+def fit(counts, rows=TOP_ROWS, columns=TOP_COLUMNS, normalize=False, percent=False, decimals=0,
+        budget=PAYLOAD_BUDGET):
+    # Collapsed (and optionally normalized, as percentages) table whose heatmap payload stays within budget:
+    # each retry shrinks the foldable axes (top not None) by the square root of the overshoot
+    while True:
+        table = normalize_table(collapse(counts, rows, columns), normalize) * (100 if percent else 1)
+        size = payload_bytes(table, decimals)
+        shrinkable = [top is not None and n > 2 for top, n in [(rows, len(table.index)), (columns, len(table.columns))]]
+        if size <= budget or not any(shrinkable):
+            return table
+        scale = (budget / size) ** 0.5
+        if shrinkable[0]:
+            rows = max(2, min(int(len(table.index) * scale), len(table.index) - 1))
+        if shrinkable[1]:
+            columns = max(2, min(int(len(table.columns) * scale), len(table.columns) - 1))
+
+
+def heatmap_trace(table, colorscale, decimals=0, text=False, value='count'):
+    x, y = table.columns.name or 'x', table.index.name or 'y'
+    return go.Heatmap(
+        x=[str(label) for label in table.columns], y=[str(label) for label in table.index], z=compact(table, decimals),
+        colorscale=colorscale, texttemplate='%{z}' if text else None,
+        hovertemplate=f'{x}: %{{x}}<br>{y}: %{{y}}<br>{value}: %{{z}}<extra></extra>')
+
+
+def heatmap(counts, title, rows=TOP_ROWS, columns=TOP_COLUMNS, normalize=False, percent=False, order_rows=None,
+            order_columns=None, colorscale='viridis', decimals=0, text=False, budget=PAYLOAD_BUDGET):
+    # px.imshow look-alike for a counts table: bounded by top-N folding and the payload budget, so its build
+    # time and bytes stay flat however many categories the axes have
+    table = reorder(fit(counts, rows, columns, normalize, percent, decimals, budget), order_rows, order_columns)
+    fig = go.Figure(heatmap_trace(table, colorscale, decimals, text, '%' if percent else 'count'))
+    fig.update_layout(title=title, xaxis=dict(title=table.columns.name, scaleanchor='y', constrain='domain'),
+                      yaxis=dict(title=table.index.name, autorange='reversed', constrain='domain'))
+    return fig
@@ -0,0 +1,254 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from aggregates import DIMENSIONS, TOTALS, aggregates_folder, build_aggregates, build_cube
+from data import SCHEMA, apply_schema
+from features import CATEGORIES, add_features, bucketize, cost_per_plate
+from sketch import QuantileSketch
+
+CATEGORY_COLUMNS = [column for column, dtype in SCHEMA.items() if dtype == 'category']
+
+
+def dimension_codes(cube):
+    # Integer key of every cube row; bools and categories alike become small ints
+    return pd.MultiIndex.from_arrays([cube[d].cat.codes.to_numpy() if hasattr(cube[d], 'cat') else cube[d].to_numpy('int8')
+                                      for d in DIMENSIONS])
+
+
+class IncrementalAggregates:
+    # The featured dataset and its aggregates, kept up to date as batches of new listings arrive.
+    # An append costs O(batch + cube): the batch is bucketized with the current cut-points and folded
+    # into the existing cube cells. Cut-points come from one QuantileSketch per source column; only when
+    # a new cut-point moves some existing value into another bucket are the rows re-bucketized and the
+    # aggregates rebuilt. Rows are kept as a list of parts and only concatenated when asked for.
+
+    def __init__(self, df, breakpoints, aggregates=None):
+        # df has its features already (add_features), breakpoints are the ones it was bucketized with;
+        # aggregates, when df already has them (e.g. a store snapshot), are taken over instead of rebuilt.
+        # Neither df nor aggregates are modified: appends work on copies
+        self.parts = [df]
+        self.dtypes = {column: df[column].dtype for column in CATEGORY_COLUMNS}
+        self.breakpoints = dict(breakpoints)
+        self.sketches = {source: QuantileSketch().update(df[source]) for source, _, _ in CATEGORIES}
+        self.version = 0
+        self.reset(aggregates or build_aggregates(df))
+
+    def reset(self, aggregates):
+        # Cube categories in the frame's order, so cube keys and batch keys share their codes
+        cube = aggregates['cube']
+        self.cube = cube.assign(**{column: cube[column].cat.set_categories(self.dtypes[column].categories)
+                                   for column in CATEGORY_COLUMNS
+                                   if column in DIMENSIONS and cube[column].dtype != self.dtypes[column]})
+        self.keys = dimension_codes(self.cube)
+        self.cell_parts = [aggregates['cells']['cell'].to_numpy()]
+        names = aggregates['names']
+        # Listings per name, aligned with the name categories (new names are appended to both)
+        self.name_counts = np.zeros(len(self.dtypes['name'].categories), dtype='int64')
+        self.name_counts[names['name'].cat.codes.to_numpy()] = names['count'].to_numpy()
+        self._names = names
+
+    @property
+    def frame(self):
+        if len(self.parts) > 1:
+            self.parts = [concat_parts(self.parts, self.dtypes)]
+        return self.parts[0]
+
+    @property
+    def cells(self):
+        if len(self.cell_parts) > 1:
+            self.cell_parts = [np.concatenate(self.cell_parts)]
+        return self.cell_parts[0]
+
+    @property
+    def names(self):
+        if self._names is None:
+            self._names = name_table(self.name_counts, self.dtypes['name'])
+        return self._names
+
+    @property
+    def aggregates(self):
+        # Same layout as build_aggregates / read_or_build_aggregates
+        return {'cube': self.cube, 'cells': pd.DataFrame({'cell': self.cells}), 'names': self.names}
+
+    def view(self):
+        # (frame, aggregates) as of now, with the frame, cells and names as builders: nothing is concatenated
+        # until a reader asks for it, so taking a view costs O(1) however many rows there are. Later appends add
+        # parts of their own and replace (never modify) cube and name counts, so the view stays as it is
+        parts, cell_parts, dtypes = list(self.parts), list(self.cell_parts), dict(self.dtypes)
+        counts, names = self.name_counts, self._names
+        return (lambda: concat_parts(parts, dtypes),
+                {'cube': self.cube,
+                 'cells': lambda: pd.DataFrame({'cell': np.concatenate(cell_parts) if len(cell_parts) > 1 else cell_parts[0]}),
+                 'names': lambda: name_table(counts, dtypes['name']) if names is None else names})
+
+    def extend_categories(self, batch):
+        # New names / locations / ... are appended to the known categories, so existing codes stay valid
+        for column in CATEGORY_COLUMNS:
+            known = self.dtypes[column].categories
+            values = batch[column].cat.categories if hasattr(batch[column], 'cat') else pd.Index(batch[column].dropna().unique())
+            new = values.difference(known)
+            if len(new):
+                self.dtypes[column] = pd.CategoricalDtype(known.append(new.sort_values()))
+            batch[column] = batch[column].astype(self.dtypes[column])
+
+    def moved(self, breakpoints, seen):
+        # Categories whose new cut-points put some already seen value (seen: source -> values) into another bucket
+        moved = []
+        for source, target, _ in CATEGORIES:
+            if np.array_equal(breakpoints[target], self.breakpoints[target]):
+                continue
+            old = bucketize(seen[source], breakpoints=self.breakpoints[target])[0].codes
+            new = bucketize(seen[source], breakpoints=breakpoints[target])[0].codes
+            if (old != new).any():
+                moved.append(target)
+        return moved
+
+    def append(self, batch):
+        # batch: new listings in the cleaned csv layout. Returns the categories that had to be re-bucketized
+        batch = apply_schema(batch.reset_index(drop=True))
+        self.extend_categories(batch)
+
+        sources = {'rate': batch['rate'], 'votes': batch['votes'], 'avg_cost_per_plate': cost_per_plate(batch)}
+        # Only values seen before the batch decide whether existing rows move
+        seen = {source: sketch.values() for source, sketch in self.sketches.items()}
+        for source, sketch in self.sketches.items():
+            sketch.update(sources[source])
+        breakpoints = {target: self.sketches[source].quantiles() for source, target, _ in CATEGORIES}
+        moved = self.moved(breakpoints, seen)
+
+        self.breakpoints = breakpoints
+        add_features(batch, breakpoints)
+        self.parts.append(batch)
+        self._names = None
+        if moved:
+            # A copy: the frame may be a snapshot's, which sessions are still reading
+            frame = self.frame.copy()
+            self.parts = [frame]
+            for source, target, _ in CATEGORIES:
+                if target in moved:
+                    frame[target] = bucketize(frame[source], breakpoints=breakpoints[target])[0]
+            self.reset(build_aggregates(frame))
+        else:
+            self.merge(batch)
+        self.version += 1
+        return moved
+
+    def merge(self, batch):
+        partial, cells = build_cube(batch)
+        # The cube may be shared (a store snapshot serving sessions), so it is updated as a copy
+        self.cube = self.cube.copy()
+        for column in CATEGORY_COLUMNS:
+            if column in DIMENSIONS and self.cube[column].dtype != self.dtypes[column]:
+                self.cube[column] = self.cube[column].cat.set_categories(self.dtypes[column].categories)
+        keys = dimension_codes(partial)
+        ids = self.keys.get_indexer(keys)
+
+        new = ids < 0
+        if new.any():
+            ids[new] = len(self.cube) + np.arange(new.sum())
+            added = partial[new].assign(**{column: 0 for column in ['count', *TOTALS]})
+            self.cube = pd.concat([self.cube, added], ignore_index=True)
+            self.keys = self.keys.append(keys[new])
+
+        columns = [self.cube.columns.get_loc(column) for column in ['count', *TOTALS]]
+        self.cube.iloc[ids, columns] = self.cube.iloc[ids, columns].to_numpy() + partial[['count', *TOTALS]].to_numpy()
+        self.cell_parts.append(ids[cells].astype('int32'))
+        codes = batch['name'].cat.codes.to_numpy()
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.dtypes['name'].categories))
+        counts[:len(self.name_counts)] += self.name_counts
+        self.name_counts = counts
+
+
+def concat_parts(parts, dtypes):
+    # Earlier parts still have the categories known when they arrived; all get the current ones first
+    parts = [part.astype({c: dtypes[c] for c in CATEGORY_COLUMNS if part[c].dtype != dtypes[c]}) for part in parts]
+    return pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+
+
+def name_table(counts, dtype):
+    # Listings per name, most listed first: the 'names' aggregate
+    index = pd.CategoricalIndex(pd.Categorical.from_codes(np.arange(len(counts)), dtype=dtype), name='name')
+    return pd.Series(counts, index=index, name='count').sort_values(ascending=False).reset_index()
+
+
+def appended_folder(sidecar):
+    # Listings appended to the csv since it was read: one rows / cells file per batch, plus the current cube and
+    # cut-points and a manifest naming the files that belong to the saved state
+    return aggregates_folder(sidecar) + '-appended'
+
+
+def breakpoints_frame(breakpoints):
+    return pd.DataFrame([(target, value) for target, values in breakpoints.items() for value in values],
+                        columns=['category', 'value'])
+
+
+def batch_file(folder, kind, number):
+    return os.path.join(folder, f'{kind}-{number:05d}.parquet')
+
+
+def write_file(write, path):
+    write(path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def write_json(value, path):
+    with open(path, 'w') as f:
+        json.dump(value, f)
+
+
+def read_manifest(folder):
+    path = os.path.join(folder, 'manifest.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_batch(folder, rows, cells, cube, breakpoints, rebased=False):
+    # Saves one append in O(batch + cube): the batch's rows and cells go to files of their own and earlier
+    # batches are never rewritten. cells are the batch's cube rows, or, when the append re-bucketized
+    # (rebased), the cube rows of every listing, which replace all cells saved before. The manifest is
+    # written last and names what a restart reads, so an interrupted save leaves the previous state whole
+    os.makedirs(folder, exist_ok=True)
+    manifest = read_manifest(folder) or {'batches': 0, 'rows': 0, 'base': 0}
+    number = manifest['batches'] + 1
+    write_file(lambda path: rows.to_parquet(path, index=False), batch_file(folder, 'rows', number))
+    write_file(lambda path: pd.DataFrame({'cell': cells}).to_parquet(path, index=False),
+               batch_file(folder, 'base' if rebased else 'cells', number))
+    write_file(lambda path: cube.to_parquet(path, index=False), batch_file(folder, 'cube', number))
+    write_file(lambda path: breakpoints_frame(breakpoints).to_parquet(path, index=False),
+               batch_file(folder, 'breakpoints', number))
+    updated = {'batches': number, 'rows': manifest['rows'] + len(rows), 'base': number if rebased else manifest['base']}
+    write_file(lambda path: write_json(updated, path), os.path.join(folder, 'manifest.json'))
+    # Files the new manifest no longer reads
+    stale = [batch_file(folder, kind, manifest['batches']) for kind in ['cube', 'breakpoints']]
+    if rebased:
+        stale += [batch_file(folder, kind, i) for kind in ['cells', 'base'] for i in range(1, number)]
+    for path in stale:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def load_appended(folder):
+    # {rows: appended listings in the cleaned layout, breakpoints, cube, base: cube rows of every listing up to
+    # the last re-bucketizing batch (None: the csv's own cells still hold), cells: those of each batch since},
+    # or None without appends
+    manifest = read_manifest(folder)
+    if manifest is None:
+        return None
+    number, base = manifest['batches'], manifest['base']
+
+    def read(kind, i):
+        return pd.read_parquet(batch_file(folder, kind, i))
+
+    frame = read('breakpoints', number)
+    return {
+        'rows': pd.concat([read('rows', i) for i in range(1, number + 1)], ignore_index=True),
+        'breakpoints': {target: group['value'].to_numpy() for target, group in frame.groupby('category', sort=False)},
+        'cube': read('cube', number),
+        'base': read('base', base)['cell'].to_numpy() if base else None,
+        'cells': [read('cells', i)['cell'].to_numpy() for i in range(base + 1, number + 1)],
+    }
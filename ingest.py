@@ -0,0 +1,137 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from aggregates import DIMENSIONS, aggregates_folder, build_cube, load_aggregates, save_aggregates
+from data import apply_schema, remove_stale, sidecar_path
+from density import BINS, binned_totals, density_grid, range_edges
+from features import CATEGORIES, QUARTILES, add_features, cost_per_plate, counted_quantiles
+
+# Rows per csv chunk: peak memory scales with this, not with the file
+CHUNK_ROWS = 200_000
+# x columns of the rating scatters (y is rate, colour is votes), binned while streaming
+DENSITY_COLUMNS = ['votes', 'avg_cost_per_plate']
+
+
+def read_chunks(path, chunksize=CHUNK_ROWS, columns=None):
+    for chunk in pd.read_csv(path, chunksize=chunksize, usecols=columns):
+        # name stays plain strings: it is only counted, and chunk-local categories would cost a sort each
+        names = chunk.pop('name') if 'name' in chunk else None
+        chunk = apply_schema(chunk)
+        if names is not None:
+            chunk.insert(0, 'name', names)
+        yield chunk
+
+
+def add_counts(total, values):
+    # Running value -> count table; merged by hashing rather than an index join, which sorts
+    counts = values.value_counts()
+    if total is None:
+        return counts
+    return pd.concat([total, counts]).groupby(level=0, sort=False).sum()
+
+
+def scan(path, chunksize=CHUNK_ROWS):
+    # First pass: everything the cut-points and bin edges need, i.e. value -> count of every
+    # category source, plus the listings per name
+    counts = dict.fromkeys([source for source, _, _ in CATEGORIES])
+    names = None
+    for chunk in read_chunks(path, chunksize, ['name', 'rate', 'votes', 'cuisines', 'cost2plates']):
+        chunk['avg_cost_per_plate'] = cost_per_plate(chunk)
+        for source in counts:
+            counts[source] = add_counts(counts[source], chunk[source])
+        names = add_counts(names, chunk['name'])
+    return counts, names
+
+
+def density_edges(counts, bins=BINS):
+    # Same edges bin_edges picks on the full columns, from their value counts
+    edges = {}
+    for column, n_bins in [*((x, bins[0]) for x in DENSITY_COLUMNS), ('rate', bins[1])]:
+        values = counts[column].index.to_numpy('float64')
+        edges[column] = range_edges(values.min(), values.max(), np.array_equal(values, np.round(values)), n_bins)
+    return edges
+
+
+def merge_cubes(cubes):
+    # Partial cubes of chunks have chunk-local categories, so they are merged on plain values
+    cube = pd.concat(cubes, ignore_index=True)
+    keys = [cube[d].astype(object) if hasattr(cube[d], 'cat') and not cube[d].cat.ordered else cube[d] for d in DIMENSIONS]
+    return cube.drop(columns=DIMENSIONS).groupby(keys, observed=True).sum().reset_index()
+
+
+def finish_cube(cube):
+    # Same categories, row order and index as build_cube on the whole file
+    for column in DIMENSIONS:
+        if cube[column].dtype == object:
+            cube[column] = cube[column].astype('category')
+    return cube.sort_values(DIMENSIONS, ignore_index=True)
+
+
+def stream_aggregates(path, chunksize=CHUNK_ROWS):
+    # Two passes over the csv with at most one chunk (plus the running results) in memory:
+    # 1. value counts -> exact quartile cut-points and density bin edges
+    # 2. features with those cut-points -> partial cube and density totals per chunk, merged as we go
+    counts, names = scan(path, chunksize)
+    breakpoints = {target: counted_quantiles(counts[source], QUARTILES) for source, target, _ in CATEGORIES}
+    edges = density_edges(counts)
+
+    cube = None
+    totals = {x: (0, 0) for x in DENSITY_COLUMNS}
+    for chunk in read_chunks(path, chunksize, lambda column: column != 'name'):
+        add_features(chunk, breakpoints)
+        partial, _ = build_cube(chunk)
+        cube = partial if cube is None else merge_cubes([cube, partial])
+        for x in DENSITY_COLUMNS:
+            chunk_counts, chunk_totals = binned_totals(chunk[x], chunk['rate'], chunk['votes'], edges[x], edges['rate'])
+            totals[x] = (totals[x][0] + chunk_counts, totals[x][1] + chunk_totals)
+
+    names = names.rename_axis('name').rename('count').sort_index()
+    names.index = names.index.astype('category')
+    aggregates = {
+        'cube': finish_cube(merge_cubes([cube])),
+        # Same sort as value_counts on the whole column, so tied names come out in the same order
+        'names': names.sort_values(ascending=False).reset_index(),
+        'breakpoints': pd.DataFrame(breakpoints),
+    }
+    for x in DENSITY_COLUMNS:
+        aggregates[f'density_{x}'] = grid_frame(density_grid(edges[x], edges['rate'], *totals[x]))
+    return aggregates
+
+
+def grid_frame(grid):
+    # Density grid as a long frame (one row per bin), so it saves like any other aggregate
+    x_centers, y_centers, counts, means = grid
+    x, y = np.meshgrid(x_centers, y_centers)
+    return pd.DataFrame({'x': x.ravel(), 'y': y.ravel(), 'count': counts.ravel(), 'mean': means.ravel()})
+
+
+def frame_grid(frame):
+    x_centers, y_centers = frame['x'].unique(), frame['y'].unique()
+    shape = (len(y_centers), len(x_centers))
+    return x_centers, y_centers, frame['count'].to_numpy().reshape(shape), frame['mean'].to_numpy().reshape(shape)
+
+
+def stream_breakpoints(aggregates):
+    return {target: aggregates['breakpoints'][target].to_numpy() for _, target, _ in CATEGORIES}
+
+
+def stream_densities(aggregates):
+    return {x: frame_grid(aggregates[f'density_{x}']) for x in DENSITY_COLUMNS}
+
+
+def read_or_stream_aggregates(path, chunksize=CHUNK_ROWS):
+    # Streamed aggregates have no per-row cell ids, so they are saved apart from the in-memory ones
+    sidecar = sidecar_path(path)
+    folder = aggregates_folder(sidecar) + '-stream'
+    if os.path.isdir(folder):
+        return load_aggregates(folder)
+
+    aggregates = stream_aggregates(path, chunksize)
+    try:
+        remove_stale(sidecar)
+        save_aggregates(aggregates, folder)
+    except (OSError, ImportError):
+        pass
+    return aggregates
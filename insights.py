@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+
+from aggregates import crosstab, rollup
+from features import CATEGORIES
+
+# Bootstrap resamples behind every confidence interval, and the interval's coverage
+RESAMPLES = 1000
+CONFIDENCE = 0.95
+SEED = 0
+# Measure -> the category column binning it in the cube (rate -> rate_category, ...)
+BINS = {measure: category for measure, category, _ in CATEGORIES}
+# Locations named as the least served by online ordering
+LOWEST = 5
+# Restaurant types / cuisines named as the most common
+TOP_TYPES = 2
+TOP_CUISINES = 3
+
+
+def strata(cube, by, column):
+    # groups x values-of-column listing counts: the strata a group's listings are resampled from
+    table = cube.groupby([by, column], observed=True)['count'].sum().unstack(fill_value=0)
+    return table.loc[table.sum(axis=1) > 0]
+
+
+def bootstrap(counts, values, variances=None, resamples=RESAMPLES, confidence=CONFIDENCE, seed=SEED):
+    # Mean per group with a percentile bootstrap interval. counts: groups x strata listing counts, values: the
+    # mean of each stratum's listings, variances: their variance around it (None: all listings of a stratum
+    # have its value). Resampling a group's n listings with replacement is one multinomial draw over its
+    # strata, so all groups and resamples are a single (resamples x groups x strata) matrix, whatever the
+    # number of listings. The k listings drawn from a stratum then sum to k * mean, give or take a normal
+    # term of variance k * variance (their central limit), which puts the spread inside strata back
+    counts = np.asarray(counts, dtype='int64')
+    values = np.asarray(values, dtype='float64')
+    n = counts.sum(axis=1)
+    rng = np.random.default_rng(seed)
+    draws = rng.multinomial(n, counts / n[:, None], size=(resamples, len(n)))
+    sums = (draws * values).sum(axis=-1)
+    if variances is not None:
+        sums += rng.standard_normal(sums.shape) * np.sqrt((draws * np.asarray(variances, dtype='float64')).sum(axis=-1))
+    means = sums / n
+    low, high = np.quantile(means, [(1 - confidence) / 2, (1 + confidence) / 2], axis=0)
+    return pd.DataFrame({'mean': (counts * values).sum(axis=1) / n, 'low': low, 'high': high})
+
+
+def share(cube, column, by=None):
+    # Share of listings with the flag `column` set (per group of `by`), with its interval; the flag is a cube
+    # dimension, so this bootstrap is exact
+    cube = cube.assign(all='all') if by is None else cube
+    counts = strata(cube, by or 'all', column).reindex(columns=[False, True], fill_value=0)
+    return bootstrap(counts, [0.0, 1.0]).set_axis(counts.index)
+
+
+def means(cube, by, measure):
+    # Mean of a measure per group of `by`, with its interval. The cube keeps sums, not single listings, so
+    # listings are resampled within the measure's category bins: the bins' counts give the spread between
+    # bins, their sums of squares the spread inside each bin
+    table = cube.groupby([by, BINS[measure]], observed=True)[['count', f'{measure}_sum', f'{measure}_sq']].sum()
+    counts = table['count'].unstack(fill_value=0)
+    size = counts.where(counts > 0, 1).to_numpy()
+    values = table[f'{measure}_sum'].unstack(fill_value=0).to_numpy() / size
+    variances = np.clip(table[f'{measure}_sq'].unstack(fill_value=0).to_numpy() / size - values ** 2, 0, None)
+    keep = counts.sum(axis=1).to_numpy() > 0
+    counts, values, variances = counts[keep], values[keep], variances[keep]
+    # Bins differ per group, so each group's stratum values go along as a row of the values matrix
+    return bootstrap(counts, values, variances).set_axis(counts.index)
+
+
+def compare(cube, by, measures=('rate', 'votes', 'avg_cost_per_plate')):
+    # {measure: mean / low / high per group of `by`} plus the group totals of every measure
+    result = {measure: means(cube, by, measure) for measure in measures}
+    result['totals'] = rollup(cube, by)
+    return result
+
+
+def ranked(table, ascending=False, exclude=('others',)):
+    # Groups of a mean / low / high table ordered by their mean, highest first by default
+    table = table[~table.index.astype(str).isin(exclude)]
+    return table.sort_values('mean', ascending=ascending, kind='stable')
+
+
+def leaders(table, k, exclude=('others',)):
+    # {row label: its k largest columns} of a counts table, e.g. the most common cuisines per online_order value
+    table = table.drop(columns=[c for c in table.columns if str(c) in exclude])
+    return {group: row[row > 0].nlargest(k).index.astype(str).tolist() for group, row in table.iterrows()}
+
+
+def largest(counts, k, exclude=('others',)):
+    counts = counts[~counts.index.astype(str).isin(exclude)]
+    return counts[counts > 0].nlargest(k).index.astype(str).tolist()
+
+
+def insights(data):
+    # Every figure quoted in the page's narrative, for the current dataset, filters and unit; all from rollups
+    # of the cube, so the cost depends on the number of groups, not listings
+    cube = data.cube
+    return {
+        'online_order': share(cube, 'online_order').iloc[0],
+        'book_table': share(cube, 'book_table').iloc[0],
+        'online_by_location': ranked(share(cube, 'online_order', 'location'), ascending=True).head(LOWEST),
+        'by_online_order': compare(cube, 'online_order'),
+        'by_book_table': compare(cube, 'book_table'),
+        'cost_by_location': ranked(means(cube, 'location', 'avg_cost_per_plate')),
+        'rest_types': largest(rollup(cube, 'rest_type')['count'], TOP_TYPES),
+        'rest_types_by_online_order': leaders(crosstab(cube, 'online_order', 'rest_type'), TOP_TYPES),
+        'cost_by_rest_type': ranked(means(cube, 'rest_type', 'avg_cost_per_plate')),
+        'cuisines': largest(data.cuisines.counts(data.cube_weights()), TOP_CUISINES),
+        'cuisines_by_online_order': leaders(data.cuisine_crosstab('online_order'), TOP_CUISINES),
+        'cuisines_by_book_table': leaders(data.cuisine_crosstab('book_table'), TOP_CUISINES),
+        # One list per rate category, then one per vote category
+        'cuisines_by_rating': [*leaders(data.cuisine_crosstab('rate_category'), TOP_CUISINES).values(),
+                               *leaders(data.cuisine_crosstab('vote_category'), TOP_CUISINES).values()],
+    }
+
+
+def ci(row, fmt='{:.2f}', confidence=CONFIDENCE):
+    # '95% CI 3.21–3.25' for a mean / low / high row
+    return f'{confidence:.0%} CI {fmt.format(row["low"])}–{fmt.format(row["high"])}'
+
+
+def interval(row, fmt='{:.2f}'):
+    # '3.23 (95% CI 3.21–3.25)'
+    return f'{fmt.format(row["mean"])} ({ci(row, fmt)})'
+
+
+def direction(a, b, more='higher', less='lower', same='about the same'):
+    return more if a > b else less if a < b else same
+
+
+def versus(table, fmt='{:.2f}', more='higher', less='lower'):
+    # (with, without, direction) texts for a mean table indexed by a True / False flag; None when the selection
+    # lacks either side
+    if not {True, False} <= set(table.index):
+        return None
+    return (interval(table.loc[True], fmt), interval(table.loc[False], fmt),
+            direction(table.loc[True, 'mean'], table.loc[False, 'mean'], more, less))
+
+
+def join(names, last='and'):
+    # 'A', 'A and B', 'A, B and C'
+    names = list(names)
+    return f' {last} '.join([', '.join(names[:-1]), names[-1]]) if len(names) > 1 else ''.join(names)
+
+
+def same(groups):
+    # Whether every group has the same leaders (in any order)
+    return len({frozenset(names) for names in groups}) <= 1
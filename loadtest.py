@@ -0,0 +1,135 @@
+import argparse
+import json
+import random
+import resource
+import threading
+import time
+from unittest.mock import MagicMock
+
+import numpy as np
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.testing.v1 import AppTest
+
+from outlets import UNITS
+
+SECTION_LABEL = 'Section'
+
+
+def rss_mb():
+    # Current resident set size (Linux); falls back to the peak elsewhere
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+
+def share_runtime():
+    # AppTest installs a mock Runtime for each run and removes it afterwards, which breaks the runs of other
+    # threads. A server has one Runtime (and one cache storage) for all sessions, so the simulated sessions
+    # share one too
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+
+
+def widget(elements, label):
+    return next((element for element in elements if element.label == label), None)
+
+
+def pick_section(at, rng):
+    radio = widget(at.main.radio, SECTION_LABEL)
+    radio.set_value(rng.choice(radio.options))
+
+
+def pick_locations(at, rng):
+    select = widget(at.sidebar.multiselect, 'Location')
+    select.set_value(rng.sample(select.options, rng.randint(0, 2)))
+
+
+def pick_unit(at, rng):
+    widget(at.sidebar.radio, 'Count restaurants as').set_value(rng.choice(list(UNITS)))
+
+
+# What a simulated visitor does between reruns, with its relative frequency
+ACTIONS = [(pick_section, 6), (pick_locations, 3), (pick_unit, 1)]
+
+
+def session(script, reruns, timeout, seed, start, latencies, errors):
+    # One browser session: the first page load, then `reruns` random interactions
+    rng = random.Random(seed)
+    at = AppTest.from_file(script, default_timeout=timeout)
+    start.wait()
+    for step in range(reruns + 1):
+        kind = 'first' if step == 0 else 'rerun'
+        # AppTest's message capture is not thread-safe and now and then returns an empty page; the
+        # session then just reruns without interacting
+        if step and widget(at.main.radio, SECTION_LABEL) is None:
+            kind = 'empty_rerun'
+        elif step:
+            action = rng.choices([a for a, _ in ACTIONS], weights=[w for _, w in ACTIONS])[0]
+            action(at, rng)
+        began = time.perf_counter()
+        try:
+            at.run()
+        except Exception as error:
+            # A broken session stops there, the others keep going
+            errors.append(repr(error))
+            return
+        latencies.append((kind, time.perf_counter() - began))
+        if at.exception:
+            errors.append(at.exception[0].value)
+
+
+def load_test(script, sessions, reruns, timeout=600, seed=0):
+    # All sessions start together in threads of this process, like a Streamlit server running one script
+    # thread per connected session
+    share_runtime()
+    latencies, errors = [], []
+    start = threading.Barrier(sessions)
+    threads = [threading.Thread(target=session, args=(script, reruns, timeout, seed + i, start, latencies, errors))
+               for i in range(sessions)]
+    rss_before = rss_mb()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report = {'sessions': sessions, 'reruns': reruns, 'seconds': round(time.perf_counter() - began, 2),
+              'errors': len(errors), 'empty_reruns': sum(kind == 'empty_rerun' for kind, _ in latencies),
+              'rss_before_mb': round(rss_before, 1), 'rss_after_mb': round(rss_mb(), 1),
+              'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10, 1)}
+    for kind in ['first', 'rerun']:
+        seconds = np.array([s for k, s in latencies if k == kind])
+        if len(seconds):
+            report[kind] = {f'p{q}': round(float(np.percentile(seconds, q)), 3) for q in (50, 95)}
+            report[kind]['max'] = round(float(seconds.max()), 3)
+    return report, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate concurrent dashboard sessions and report rerun latency and RSS.')
+    parser.add_argument('--sessions', type=int, default=8)
+    parser.add_argument('--reruns', type=int, default=10, help='interactions per session after the first load')
+    parser.add_argument('--script', default='main.py')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the report as json to this file (default: stdout)')
+    args = parser.parse_args()
+
+    report, errors = load_test(args.script, args.sessions, args.reruns, seed=args.seed)
+    for error in sorted(set(errors))[:5]:
+        print('error:', error)
+    text = json.dumps(report, indent=1)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
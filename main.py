@@ -1,8 +1,26 @@
+import os
+import threading
+from contextlib import nullcontext
+
+import numpy as np
 import pandas as pd
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+
+from aggregates import build_aggregates, filter_cube
+from charts import CHARTS, ChartData, book_table_summary, online_order_summary
+from combos import itemset_breakdown, itemsets
+from cuisine_index import CuisineIndex
+from data import DATA_PATH, memory_footprint, untyped_footprint
+from export import FORMATS, export_bytes
+from figure_cache import FigureCache, figure_key
+from filters import build_bitmasks, select
+from insights import ci, direction, insights, interval, join, same, versus
+from outlets import UNITS, OutletIndex
+from opportunity import OpportunityIndex
+from profiling import Profiler, figure_bytes, table_bytes
+from similarity import METHODS, location_profiles, most_similar, similarity_matrix
+from store import STORE
+from viewer import PAGE_SIZE, SORT_COLUMNS, build_viewer_index, page, plain
 
 st.set_page_config(layout='wide', page_title='Zomato Data Analysis', page_icon='📊')
 
@@ -25,11 +43,191 @@ st.link_button(label='Go', url= 'https://www.kaggle.com/datasets/himanshupoddar/
 st.subheader('Data Cleaning on Kaggle')
 st.link_button(label='Go' , url = 'https://www.kaggle.com/code/rajeevnayantripathi/data-cleaning-eda-on-zomato-bangalore-dataset')
 
-st.subheader('Cleaned Dataset')
-df = pd.read_csv('zomato_cleaned.csv')
-st.dataframe(df)
-
-st.download_button(label='Download', data=df.to_csv(), file_name='zomato_data.csv')
+# Dataset, features and aggregates are loaded once per process and shared by every session (see store.py);
+# what is derived from them is built on first use and lives as long as that dataset version
+with st.spinner('Loading dataset...'):
+    snapshot = STORE.get(DATA_PATH)
+fingerprint = snapshot.fingerprint
+df, breakpoints, aggregates = snapshot.df, snapshot.breakpoints, snapshot.aggregates
+full_cube = aggregates['cube']
+
+def outlet_view(snapshot):
+    # Outlet index, the one-row-per-outlet frame the unique outlet charts read, and its aggregates
+    outlets = OutletIndex(snapshot.df)
+    frame = outlets.frame(snapshot.df)
+    return outlets, frame, build_aggregates(frame)
+
+def cuisine_index(level):
+    # level 'cube' indexes the aggregate cube (weighted by its counts), 'outlets' the unique outlets' cube,
+    # 'rows' the listings themselves
+    def build(snapshot):
+        if level == 'outlets':
+            return CuisineIndex(snapshot.derive('outlets', outlet_view)[2]['cube']['cuisines'])
+        return CuisineIndex((snapshot.aggregates['cube'] if level == 'cube' else snapshot.df)['cuisines'])
+    return snapshot.derive(f'cuisine_index:{level}', build)
+
+cuisines = cuisine_index('cube')
+
+# Sidebar filters: empty selections mean everything
+with st.sidebar:
+    st.header('Filters')
+    # Sorted: categories added by appends come after the existing ones
+    selections = {
+        'location': st.multiselect('Location', sorted(df['location'].cat.categories)),
+        'rest_type': st.multiselect('Restaurant type', sorted(df['rest_type'].cat.categories)),
+        'type': st.multiselect('Meal type', sorted(df['type'].cat.categories)),
+    }
+    for column, label in [('online_order', 'Online order'), ('book_table', 'Table booking')]:
+        choice = st.radio(label, ['Any', 'Yes', 'No'], horizontal=True)
+        selections[column] = [] if choice == 'Any' else [choice == 'Yes']
+    low, high = int(df['avg_cost_per_plate'].min()), int(df['avg_cost_per_plate'].max())
+    ranges = {'avg_cost_per_plate': st.slider('Avg. cost per plate (₹)', low, high, (low, high))}
+    low, high = float(df['rate'].min()), float(df['rate'].max())
+    ranges['rate'] = st.slider('Rating', low, high, (low, high), step=0.1)
+    # Default for every chart; a chart can still be asked for the other unit
+    default_unit = st.radio('Count restaurants as', list(UNITS), format_func=UNITS.get, horizontal=True,
+                            help='A restaurant is listed once per listing type (Buffet, Delivery, ...); '
+                                 'unique outlets count it once per location.')
+    # New listings are folded into the shared aggregates (see DatasetStore.append); every session sees them
+    # on its next rerun, without the csv being rewritten or the dataset rebuilt
+    with st.expander('Add listings'), st.form('append_listings', clear_on_submit=True):
+        upload = st.file_uploader('New listings (cleaned csv layout)', type='csv')
+        if st.form_submit_button('Append') and upload is not None:
+            try:
+                STORE.append(DATA_PATH, pd.read_csv(upload))
+            except ValueError as error:
+                # Also a file read_csv cannot parse (ParserError, UnicodeDecodeError)
+                st.error(f'Could not add {upload.name}: {error}')
+            else:
+                st.rerun()
+
+# Opt-in instrumentation: ?profile=timing (wall time, payload bytes) or ?profile=detail (also pandas vs
+# figure time and peak allocation), or the same via the DASHBOARD_PROFILE environment variable
+profile_level = st.query_params.get('profile', os.environ.get('DASHBOARD_PROFILE', ''))
+if profile_level in ('timing', 'detail'):
+    profiler = st.session_state.setdefault('profiler', Profiler(st.runtime.scriptrunner.get_script_run_ctx().session_id))
+    profiler.level = profile_level
+    profiler.start_run()
+else:
+    profiler = None
+
+def profiled(kind, name, build, payload=None, **values):
+    return build() if profiler is None else profiler.measure(kind, name, build, payload, **values)
+
+mask = profiled('step', 'filter_mask', lambda: select(snapshot.derive('bitmasks', lambda s: build_bitmasks(s.df)), len(df), selections, ranges, df))
+if mask is None:
+    cube = full_cube
+    names = aggregates['names']
+else:
+    if not mask.any():
+        st.warning('No restaurants match the current filters.')
+        if profiler is not None:
+            profiler.end_run()
+        st.stop()
+    cube = profiled('step', 'filter_cube', lambda: filter_cube(full_cube, aggregates['cells']['cell'].to_numpy(), df, mask))
+    names = df['name'][mask].value_counts().rename('count').reset_index()
+    st.sidebar.caption(f'{mask.sum():,} of {len(df):,} listings selected')
+
+chart_data = ChartData(cube, full_cube, names, cuisines, frame=df, mask=mask)
+filter_state = 'all' if mask is None else repr((selections, ranges))
+unit_data = {'listings': chart_data}
+
+def data_for(unit):
+    # Unique outlet view of the same selection, built on first use: outlets with any selected listing
+    if unit not in unit_data:
+        outlets, frame, outlet_cube = snapshot.derive('outlets', outlet_view)
+        selected = None if mask is None else outlets.select(mask)
+        if selected is None:
+            data_cube, data_names = outlet_cube['cube'], outlet_cube['names']
+        else:
+            data_cube = filter_cube(outlet_cube['cube'], outlet_cube['cells']['cell'].to_numpy(), frame, selected)
+            data_names = frame['name'][selected].value_counts().rename('count').reset_index()
+        unit_data[unit] = ChartData(data_cube, outlet_cube['cube'], data_names,
+                                    cuisine_index('outlets'), frame=frame, mask=selected)
+    return unit_data[unit]
+
+@st.cache_resource
+def load_figure_cache():
+    return FigureCache()
+
+@st.cache_resource(max_entries=2)
+def warm_figures(fingerprint):
+    # Runs once per dataset version, in the background, so the first visitor does not wait for it
+    data = ChartData(full_cube, full_cube, aggregates['names'], cuisines, frame=df)
+    thread = threading.Thread(target=load_figure_cache().warm, args=(fingerprint, 'all', CHARTS, data), daemon=True)
+    thread.start()
+    return thread
+
+warm_figures(fingerprint)
+
+def chart(spec_id, unit=None, **options):
+    # Repeat views of the same chart, data version and filters come straight from the figure cache.
+    # unit overrides the sidebar's listings / unique outlets choice for this chart
+    unit = unit or default_unit
+    key = figure_key(fingerprint, filter_state, spec_id, options if unit == 'listings' else dict(options, unit=unit))
+    cache = load_figure_cache()
+    build = lambda: cache.figure(key, lambda: CHARTS[spec_id](data_for(unit), **options))
+    if profiler is None:
+        return build()
+    hits = cache.hits
+    fig = profiler.measure('chart', spec_id, build, figure_bytes, **options)
+    profiler.run['records'][-1]['cached'] = cache.hits > hits
+    return fig
+
+def table(name, build):
+    return profiled('table', name, build, table_bytes)
+
+@st.cache_data(max_entries=2)
+def memory_report(fingerprint):
+    return untyped_footprint(df), memory_footprint(df)
+
+@st.cache_resource(max_entries=8, show_spinner='Preparing export...')
+def build_export(fingerprint, fmt, scope_key, _rows):
+    # scope_key identifies _rows (filters / viewer state), so the row array itself is never hashed. A resource
+    # cache keeps the export as one shared bytes object: built (and copied out of its buffer) once, then handed
+    # to the download button as is on every rerun
+    return export_bytes(df, fmt, _rows)
+
+@st.experimental_fragment
+def dataset_viewer():
+    st.subheader('Cleaned Dataset')
+    # Only one page of rows is sent to the browser; search and sorting happen here
+    col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+    query = col1.text_input('Search name, location or cuisine')
+    sort_by = col2.selectbox('Sort by', SORT_COLUMNS, index=SORT_COLUMNS.index('votes'))
+    descending = col3.toggle('Descending', value=True)
+    page_number = col4.number_input('Page', min_value=1, value=1, step=1)
+    rows, total = profiled('table', 'viewer_page', lambda: page(df, snapshot.derive('viewer_index', lambda s: build_viewer_index(s.df)), query, sort_by,
+                                                                descending, page_number, mask=mask),
+                           lambda result: table_bytes(result[0]))
+    st.dataframe(rows, hide_index=True)
+    st.caption(f'Rows {min((page_number - 1) * PAGE_SIZE + 1, total):,}-{min(page_number * PAGE_SIZE, total):,} '
+               f'of {total:,} (page {page_number} of {max(-(-total // PAGE_SIZE), 1):,})')
+
+    before, after = memory_report(fingerprint)
+    st.caption(f'In-memory size: {after / 2**20:.1f} MB typed, down from {before / 2**20:.1f} MB as plain strings')
+    st.caption('Category cut-points (low < first, mid up to last, high above): ' +
+               ', '.join(f'{name} {edges[0]:g} / {edges[-1]:g}' for name, edges in breakpoints.items()))
+
+    # Exports are only built on request and then reused until the data, filters or format change
+    col1, col2, col3 = st.columns([2, 2, 1])
+    fmt = col1.selectbox('Export format', list(FORMATS))
+    scope = col2.selectbox('Export rows', ['Filtered rows', 'Visible page', 'Whole dataset'])
+    if scope == 'Whole dataset':
+        export_rows, scope_key = None, 'all'
+    elif scope == 'Visible page':
+        export_rows, scope_key = rows.index.to_numpy(), repr(('page', query, sort_by, descending, page_number, selections, ranges))
+    else:
+        export_rows, scope_key = (None if mask is None else np.flatnonzero(mask)), repr(('filtered', selections, ranges))
+    export_key = (fingerprint, fmt, scope_key)
+    if col3.button('Prepare download'):
+        st.session_state['export_key'] = export_key
+    if st.session_state.get('export_key') == export_key:
+        extension, mime = FORMATS[fmt]
+        st.download_button(label='Download', data=build_export(fingerprint, fmt, scope_key, export_rows),
+                           file_name=f'zomato_data.{extension}', mime=mime)
+
+dataset_viewer()
 
 st.subheader('Objective')
 
@@ -58,98 +256,169 @@ analysis_points_text = """
 """
 st.markdown(analysis_points_text)
 
-# Basic Feature Engineering
-
-# 1.
-num_cuisines = df['cuisines'].str.split(',').str.len()
-avg_cost_per_plate = round(df['cost2plates']/num_cuisines).astype('int')
-df.insert(9,'avg_cost_per_plate',avg_cost_per_plate )
-
-# 2.
-lower = df['rate'].quantile(0.25)
-upper = df['rate'].quantile(0.75)
-
-def categorize_rate(x):
-  if x < lower:
-    return 'low'
-  elif lower<= x <=upper:
-    return 'mid'
-  else:
-     return 'high'
-
-rate_category = df['rate'].apply(categorize_rate)
-df.insert(4,'rate_category',rate_category )
-
-# 3.
-lower = df['votes'].quantile(0.25)
-upper = df['votes'].quantile(0.75)
-
-def categorize_vote(x):
-  if x < lower:
-    return 'low'
-  elif lower<= x <=upper:
-    return 'mid'
-  else:
-     return 'high'
-
-
-vote_category = df['votes'].apply(categorize_vote)
-df.insert(6,'vote_category',vote_category )
-
-# 4.
-lower = df['avg_cost_per_plate'].quantile(0.25)
-upper = df['avg_cost_per_plate'].quantile(0.75)
-
-def categorize_avg_cost_per_plate(x):
-  if x < lower:
-    return 'low'
-  elif lower<= x <=upper:
-    return 'mid'
-  else:
-     return 'high'
-
-
-cost_category = df['avg_cost_per_plate'].apply(categorize_avg_cost_per_plate)
-df.insert(12,'cost_category',cost_category)
-
-df.drop(columns = 'cost2plates',inplace= True)
-
-st.markdown(
-    f"""
+@st.experimental_fragment
+def cuisine_lookup():
+    # Own fragment: picking a cuisine reruns only this lookup
+    listing_cuisines = cuisine_index('rows')
+    choice = st.selectbox('Restaurants serving', [c for c in listing_cuisines.vocabulary if c != 'others'])
+    rows = listing_cuisines.rows(choice)
+    temp = df.iloc[rows if mask is None else rows[mask[rows]]]
+    st.write(f'- **{len(temp):,}** listings serve {choice}, across **{temp["location"].nunique()}** locations.')
+    st.dataframe(table('cuisine_lookup', lambda: plain(temp.nlargest(20, 'votes')[['name', 'location', 'rest_type', 'cuisines', 'rate', 'votes']])),
+                 hide_index=True)
+
+@st.experimental_fragment
+def rating_scatters():
+    mode = st.radio('Scatter rendering', ['Auto', 'Density', 'WebGL sample', 'All points'], horizontal=True)
+    options = {} if mode == 'Auto' else {'mode': mode}
+
+    col1,col2 = st.columns(2)
+
+    with col1:
+        st.plotly_chart(chart('rating_vs_votes', **options))
+        st.write('- As restaurants rating increases , number of votes also increases.')
+
+    with col2:
+        st.plotly_chart(chart('rating_vs_cost', **options))
+        st.write('- As restaurants rating increases , avg. cost per plate also increases')
+
+@st.cache_data(max_entries=8)
+def load_similarity(fingerprint, filter_state, unit, method, _data):
+    # One matrix per dataset version, filters, unit and method; _data is identified by the other arguments
+    return similarity_matrix(location_profiles(_data), method)
+
+@st.experimental_fragment
+def similar_neighborhoods():
+    st.subheader('Similarity between Neighborhoods')
+    col1, col2, col3 = st.columns([3, 2, 1])
+    method = col2.radio('Similarity', METHODS, horizontal=True)
+    locations = data_for(default_unit).cube['location'].astype(str)
+    if locations[locations != 'others'].nunique() < 2:
+        st.info('Select at least two locations to compare neighborhoods.')
+        return
+    similarity = load_similarity(fingerprint, filter_state, default_unit, method, data_for(default_unit))
+    location = col1.selectbox('Neighborhood', similarity.index)
+    k = col3.number_input('Top', min_value=1, max_value=len(similarity) - 1, value=min(5, len(similarity) - 1))
+    st.dataframe(table('most_similar', lambda: most_similar(similarity, location, k)), hide_index=True)
+    st.markdown('- Similarity combines cuisine shares, restaurant type mix, cost category mix and average rating of each location.')
+    st.plotly_chart(chart('neighborhood_similarity', method=method))
+
+@st.cache_data(max_entries=8)
+def load_itemsets(fingerprint, filter_state, unit, size, _data):
+    return itemsets(_data.cuisines, _data.cube_weights(), size)
+
+@st.experimental_fragment
+def cuisine_combinations():
+    st.subheader('Cuisines Served Together')
+    col1, col2 = st.columns(2)
+    size = col1.radio('Combination', ['Pairs', 'Triples'], horizontal=True)
+    by = col2.radio('Share within', ['All', 'location', 'rate_category'], horizontal=True)
+    data = data_for(default_unit)
+    combos = load_itemsets(fingerprint, filter_state, default_unit, 2 if size == 'Pairs' else 3, data)
+    if combos.empty:
+        st.info('No cuisine combination is frequent enough in the current selection.')
+        return
+    if by == 'All':
+        st.dataframe(table('cuisine_combinations', lambda: combos.head(50)), hide_index=True)
+    else:
+        st.dataframe(table('cuisine_combinations', lambda: itemset_breakdown(
+            data.cuisines, data.cube_weights(), data.full_cube[by], combos).round(3)))
+    st.markdown('- Lift above 1 means the cuisines are served together more often than their own popularity explains.')
+    st.plotly_chart(chart('cuisine_cooccurrence'))
+
+@st.cache_resource(max_entries=8)
+def load_opportunities(fingerprint, filter_state, unit, _data):
+    # The cuisine index is built on the full cube, so the selection's sums are laid over it (0 elsewhere)
+    sums = {column: _data.cube[column].reindex(_data.full_cube.index, fill_value=0) for column in ['count', 'rate_sum', 'votes_sum']}
+    return OpportunityIndex(_data.full_cube.assign(**sums), _data.cuisines)
+
+@st.experimental_fragment
+def opening_opportunities():
+    st.subheader('Where to Open: Under-served Combinations')
+    index = load_opportunities(fingerprint, filter_state, default_unit, data_for(default_unit))
+    col1, col2, col3, col4 = st.columns(4)
+    filters = {
+        'location': col1.multiselect('Locations', index.labels['location']),
+        'cuisines': col2.multiselect('Cuisines', index.labels['cuisines']),
+        'rest_type': col3.multiselect('Types', [t for t in index.labels['rest_type'] if t != 'others']),
+        'cost_category': col4.multiselect('Price band', index.labels['cost_category']),
+    }
+    result = table('opening_opportunities', lambda: index.query(**{axis: values or None for axis, values in filters.items()}))
+    if result.empty:
+        st.info('No combination in this selection is expected to have at least one listing.')
+        return
+    st.dataframe(result, hide_index=True)
+    st.markdown('- **supply** is the listings serving that cuisine with that type and price band in the location, **expected** '
+                'what it would have if the combination were spread like listings overall; rating and votes are per listing, '
+                'pulled toward the city-wide mean where there are few.')
+
+# Sections render lazily: only the selected one computes its aggregates and figures
+SECTIONS = ['Basic Insights', '1. Online Ordering & Table Booking', '2. Location', '3. Cuisine',
+            '4. Rating & Votes', '5. Restaurant Type']
+section = st.radio('Section', SECTIONS, horizontal=True)
+
+@st.cache_data(max_entries=8)
+def load_insights(fingerprint, filter_state, unit, _data):
+    return insights(_data)
+
+def narrative():
+    # Figures quoted in the text below, for the current dataset, filters and unit
+    return load_insights(fingerprint, filter_state, default_unit, data_for(default_unit))
+
+def leading(groups, facility):
+    # '**A and B**, both with and without {facility}' when both sides share their leaders, else each side's
+    names = {flag: f'**{join(groups[flag])}**' for flag in (True, False) if groups.get(flag)}
+    if len(names) < 2 or same(groups.values()):
+        return f'{next(iter(names.values()), "no category")}, both with and without {facility}'
+    return f'{names[True]} with {facility} and {names[False]} without it'
+
+def comparison(result, facility, total_votes=False):
+    # Rate / votes / cost bullets comparing listings with (Yes) and without (No) a facility
+    rate = versus(result['rate'])
+    votes = versus(result['votes'], '{:,.2f}', 'more', 'fewer')
+    cost = versus(result['avg_cost_per_plate'], '₹{:,.2f}')
+    if rate is None:
+        return f'- The current selection only has restaurants {"with" if result["totals"].index[0] else "without"} {facility}, so there is nothing to compare.'
+    if total_votes:
+        totals = result['totals']['votes_sum']
+        vote_line = (f'Restaurants with {facility} (Yes) have {direction(totals[True], totals[False], "more", "fewer")} votes in total '
+                     f'({totals[True]:,.0f}) than those without (No) ({totals[False]:,.0f}); per restaurant {votes[0]} vs {votes[1]}.')
+    else:
+        vote_line = f'Restaurants with {facility} (Yes) receive {votes[2]} votes on average, {votes[0]}, than those without (No), {votes[1]}.'
+    return f"""- **Rate:** Restaurants with {facility} (Yes) have a {rate[2]} average rating, {rate[0]}, than those without (No), {rate[1]}.
+- **Votes:** {vote_line}
+- **Avg_cost_per_plate:** Restaurants with {facility} (Yes) have a {cost[2]} average cost per plate, {cost[0]}, than those without (No), {cost[1]}."""
+
+def basic_insights():
+    st.markdown(
+        f"""
     <h1 style='text-align: center; font-family: Arial, sans-serif;'> Few Basic Insights</h1>
     """,
-    unsafe_allow_html=True
-)
+        unsafe_allow_html=True
+    )
 
-col1,col2 = st.columns(2)
+    col1,col2 = st.columns(2)
 
-with col1:
-    temp = df['name'].value_counts().head(20).reset_index()
-    fig = px.bar(temp,x='name',y='count',color = 'name',hover_name = 'name',text_auto = True,
-             title = 'Top 20 Most Popular Restaurants in Bangalore')
-    fig.update_layout(xaxis = dict(title ='restaurant'))
-    st.plotly_chart(fig)
+    with col1:
+        # Chains are counted in outlets by default; listings count an outlet once per listing type
+        unit = st.radio('Count', list(UNITS), index=1, format_func=UNITS.get, horizontal=True, key='top_restaurants_unit')
+        st.plotly_chart(chart('top_restaurants', unit=unit))
 
-with col2:
-    temp = df['location'].value_counts().reset_index()
-    temp.drop(index=temp[temp['location'] == 'others'].index, inplace=True)
-    temp = temp.reset_index(drop=True)
-    fig = px.bar(temp, x='location', y='count', color='location', hover_name='location', title='Top Crowded Restaurants Location in Banglore')
-    st.plotly_chart(fig)
+    with col2:
+        st.plotly_chart(chart('crowded_locations'))
 
-col1, col2 = st.columns(2)
+    col1, col2 = st.columns(2)
+    stats = narrative()
+    online, booking = stats['online_order'], stats['book_table']
 
-# Online Order Analysis
-with col1:
+    # Online Order Analysis
+    with col1:
 
-    temp = df['online_order'].value_counts().reset_index()
-    fig1 = px.pie(temp, values='count', names='online_order', hole=0.5,
-                  hover_name='online_order', title='Restaurants Providing Online/Offline Facility')
-    st.plotly_chart(fig1)
+        st.plotly_chart(chart('online_order_share'))
 
-    st.markdown("""
-    - **59% of restaurants provide online order facility.**
-    - **41% of restaurants do not provide online order facility.**
+        st.markdown(f"""
+    - **{online['mean']:.0%} of restaurants provide online order facility** ({ci(online, '{:.1%}')}).
+    - **{1 - online['mean']:.0%} of restaurants do not provide online order facility.**
     - Modern lifestyles favor convenience, prompting a shift towards online food ordering. 
       Factors like traffic congestion and long work hours make dining out less feasible.
     - Online ordering and delivery services offer a solution by providing restaurant-quality meals at home.
@@ -157,68 +426,46 @@ with col1:
       This trend reflects an adaptation to changing consumer behaviors and preferences.
     """)
 
-# Book Table Analysis
-with col2:
+    # Book Table Analysis
+    with col2:
 
-    temp = df['book_table'].value_counts().reset_index()
-    fig2 = px.pie(temp, values='count', names='book_table', hole=0.5,
-                  hover_name='book_table', title='Book Table Facility Distribution')
-    st.plotly_chart(fig2)
+        st.plotly_chart(chart('book_table_share'))
 
-    st.markdown("""
-    - **Majority (87.5%) of restaurants do not offer table booking facilities.**
-    - **A small percentage (12.5%) of restaurants provide table booking options.**
+        st.markdown(f"""
+    - **{'Majority' if booking['mean'] < 0.5 else 'A minority'} ({1 - booking['mean']:.1%}) of restaurants do not offer table booking facilities.**
+    - **{'A small percentage' if booking['mean'] < 0.5 else 'Most'} ({booking['mean']:.1%}) of restaurants provide table booking options** ({ci(booking, '{:.1%}')}).
     - This suggests varying levels of demand for reservation services among customers.
     """)
 
-st.markdown(
-    f"""
-    <h1 style='text-align: center; font-family: Arial, sans-serif;'>Insights for Opening New Restaurant</h1>
-    """,
-    unsafe_allow_html=True
-)
-
-st.subheader('1. Online Ordering and Table Booking facilities for optimal customer engagement')
-st.markdown("""- This title underscores the importance of incorporating both online ordering and table booking facilities for
+def online_and_table_booking():
+    st.subheader('1. Online Ordering and Table Booking facilities for optimal customer engagement')
+    st.markdown("""- This title underscores the importance of incorporating both online ordering and table booking facilities for
             enhancing customer engagement and provides valuable insights for prospective restaurant owners aiming to open a new establishment.""")
 
-col1, col2 = st.columns(2)
+    col1, col2 = st.columns(2)
 
-with col1:
-  indexing = df[df['location'].str.contains('others')].index
-  temp= df.copy()
-  temp.drop(index = indexing,inplace = True)
-  temp_df = pd.crosstab(temp['location'],temp['online_order'])
-  fig = px.bar(temp_df,x=temp_df.index,y=temp_df.columns,barmode='group',title = 'Online/Offline Orders vs Location',color_discrete_map={'Yes':'Red','No':'Blue'})
-  st.plotly_chart(fig)
+    with col1:
+      st.plotly_chart(chart('online_order_by_location'))
 
-with col2:
-    st.markdown(""" 
-    1. Restaurants in locality of **(Church Street ,Electronic City, Lavelle Road, MG Road, Residency Road)** has 
-    less number of online ordering restaurants.
+    with col2:
+        lowest = narrative()['online_by_location']
+        st.markdown(f""" 
+    1. Restaurants in locality of **({', '.join(sorted(lowest.index.astype(str)))})** have the lowest share of
+    online ordering restaurants ({lowest['mean'].min():.0%} to {lowest['mean'].max():.0%}).
     2. This statement simply explains that there are fewer restaurants offering online ordering services in the mentioned areas.
     3. Recognizing areas with lower availability of online ordering restaurants highlights potential market gaps""")
 
-st.divider()
-
+    st.divider()
 
-temp = (df.groupby('online_order').agg({'rate':'mean','votes':'mean','avg_cost_per_plate':'mean'})).round(2)
-st.dataframe(temp)
 
-fig = px.treemap(df, path=[px.Constant('Online Order Facility'), 'online_order', 'location'],
-                     color='avg_cost_per_plate', color_continuous_scale='plasma',
-                    title = 'Average Cost per plate based on Online/Offline Order facility')
+    st.dataframe(table('online_order_summary', lambda: online_order_summary(data_for(default_unit))))
 
-fig.update_layout(height = 500, width = 1200)
-st.plotly_chart(fig)
+    st.plotly_chart(chart('online_order_treemap'))
 
-col1,col2 = st.columns(2)
+    col1,col2 = st.columns(2)
 
-with col1:
-    st.markdown("""
-- **Rate:** Restaurants offering online orders (Yes) have a slightly higher average rating (3.23) compared to those without online orders (No) with a rating of 3.15.
-- **Votes:** Restaurants with online orders (Yes) receive more votes on average (307.92) compared to those without (No) with an average of 251.20 votes.
-- **Avg_cost_per_plate:** Restaurants with online orders (Yes) have a lower average cost per plate (₹462.10) compared to those without (No) with an average cost per plate of ₹533.25.
+    with col1:
+        st.markdown(comparison(narrative()['by_online_order'], 'online orders') + """
 From this data:
 
 - **Moderate Rate Improvement:** Restaurants offering online orders tend to have a slightly higher average rating compared to those without, though the difference is not substantial.
@@ -228,8 +475,8 @@ From this data:
    - the service provided.
  - Customers rate a restaurant based on how good the food tastes and looks, and how well they were treated by the staff.""")
 
-with col2 :
-  st.markdown("""  
+    with col2 :
+      st.markdown("""  
  - While online ordering can be convenient, it doesn't really affect these important factors that shape the overall rating. So, while it's handy, it's not the main thing customers consider when rating a restaurant.
 
 - **Increased Votes:** There's a noticeable difference in the number of votes between restaurants with and without online orders. Restaurants offering online orders receive more votes on average, suggesting that this service may attract more attention and engagement from customers.
@@ -242,69 +489,52 @@ with col2 :
 """)
 
 
-st.divider()
+    st.divider()
 
 
-temp = (df.groupby('book_table').agg({'rate':'mean','votes':'sum','avg_cost_per_plate':'mean'})).round(2)
-st.dataframe(temp)
+    st.dataframe(table('book_table_summary', lambda: book_table_summary(data_for(default_unit))))
 
-fig = px.treemap(df, path=[px.Constant('Book Table Facility'), 'book_table', 'location'], color='avg_cost_per_plate'
-                   , color_continuous_scale= 'plasma')
-fig.update_layout(height=500, width=1200)
-st.plotly_chart(fig)
+    st.plotly_chart(chart('book_table_treemap'))
 
-st.markdown("""
-  - **Rate:** Restaurants with table booking (Yes) have a higher average rating (3.76) compared to those without (No) with a rating of 3.12.
-  - **Votes:** There's a slightly higher number of votes for restaurants with table booking (7,355,716) compared to those without (7,219,584).
-  - **Avg_cost_per_plate:** Restaurants with table booking (Yes) have a significantly higher average cost per plate (₹1215.30) compared to those without (No) with an average cost per plate of ₹387.54.
+    st.markdown(comparison(narrative()['by_book_table'], 'table booking', total_votes=True) + """
   Based on this data:
   - **Better Service:** The higher average rating for restaurants with table booking services suggests that they may indeed provide better service, leading to increased customer satisfaction.
   - **Comparable Votes:** While there is a slight difference in the number of votes between restaurants with and without table booking, it's not a substantial difference, suggesting that the presence of table booking might not significantly influence the number of votes a restaurant receives.
   - **Wealthier Crowd:** The significantly higher average cost per plate for restaurants with table booking services implies that they may cater to a wealthier clientele who are willing to spend more on dining experiences.
   """)
 
-st.divider()
-
-indexing = df[df['rest_type'].str.contains('others')].index
-temp= df.copy()
-temp.drop(index = indexing,inplace = True)
-temp_df = ((pd.crosstab(temp['online_order'],temp['rest_type'],normalize = 'index'))*100).round()
-
+    st.divider()
 
-col1,col2 = st.columns(2)
+    col1,col2 = st.columns(2)
 
-with col1:
-  fig = px.imshow(temp_df,text_auto = True,color_continuous_scale = 'viridis',title = 'Comparison of Online and Offline Ordering by Restaurant Type')
-  st.plotly_chart(fig)
+    with col1:
+      st.plotly_chart(chart('online_order_by_rest_type'))
 
-with col2:
-  st.markdown("""
-  - Based on the data, it's evident that **Quick Bites and Casual Dining** are the most common types of restaurants, both for those offering online ordering and those not offering it.
-  - This indicates that Quick Bites and Casual Dining establishments are popular choices for customers, whether they prefer to order online or offline.
+    with col2:
+      stats = narrative()
+      common = join(stats['rest_types'])
+      st.markdown(f"""
+  - Based on the data, the most common types of restaurants are {leading(stats['rest_types_by_online_order'], 'online ordering')}.
+  - This indicates that {common} establishments are popular choices for customers, whether they prefer to order online or offline.
   - The distribution of restaurant types between online and offline ordering categories is quite similar. This suggests that the availability of online ordering doesn't significantly alter the distribution of restaurant types.
-  - Despite the prevalence of Quick Bites and Casual Dining, there might be opportunities for other types of restaurants, such as **Cafes or Dessert Parlors, to explore and potentially expand their online ordering services** to cater to changing consumer preferences.
+  - Despite the prevalence of {common}, there might be opportunities for other types of restaurants, such as **Cafes or Dessert Parlors, to explore and potentially expand their online ordering services** to cater to changing consumer preferences.
   """)
 
-st.divider()
+    st.divider()
 
-# Location
+def location_analysis():
+    # Location
 
-st.subheader("2. Strategic Location Analysis: Enhancing New Restaurant Success through Data-Driven Insights")
-st.markdown("""- This title emphasizes the importance of choosing the right location for a new restaurant and highlights 
+    st.subheader("2. Strategic Location Analysis: Enhancing New Restaurant Success through Data-Driven Insights")
+    st.markdown("""- This title emphasizes the importance of choosing the right location for a new restaurant and highlights 
 how analyzing location data can provide valuable insights into factors such as foot traffic, proximity to residential or commercial areas, and potential competitors""")
 
-col1,col2 = st.columns(2)
-with col1:
-  indexing = df[df['location'].str.contains('others')].index
-  temp= df.copy()
-  temp.drop(index = indexing,inplace = True)
-  temp_df = pd.crosstab(temp['location'],temp['book_table'])
-  fig = px.bar(temp_df, x=temp_df.index, y=temp_df.columns, barmode='group',color_discrete_map={'Yes':'Red','No':'Blue'},
-               title = 'Presence of Table Booking Facilities Across Different Locations')
-  st.plotly_chart(fig)
-
-with col2:
-  st.markdown("""
+    col1,col2 = st.columns(2)
+    with col1:
+      st.plotly_chart(chart('book_table_by_location'))
+
+    with col2:
+      st.markdown("""
   - The visualization highlights variations in the availability of table booking facilities across different locations.
   - Certain locations show a higher concentration of restaurants offering table booking, indicating potentially higher demand or preference for this service.
   - Conversely, some locations have fewer restaurants with table booking facilities, suggesting potential opportunities for new openings to cater to this demand.
@@ -312,70 +542,54 @@ with col2:
   - Understanding the distribution of table booking facilities across
     various locations can inform strategic decisions for restaurant owners and investors looking to optimize their offerings and target specific demographics.""")
 
-st.divider()
+    st.divider()
 
-col1,col2 = st.columns(2)
+    col1,col2 = st.columns(2)
 
-with col1:
-  temp = (df.groupby('location')['avg_cost_per_plate'].mean()).round().sort_values(ascending = False).reset_index()
-  fig = px.bar(temp,x='location',y='avg_cost_per_plate',color='location',text_auto = True,hover_name = 'avg_cost_per_plate',
-               title = 'Average cost per plate on different Locations')
-  fig.update_layout(yaxis=dict(title='Avgerage cost per plate'))
-  st.plotly_chart(fig)
+    with col1:
+      st.plotly_chart(chart('cost_by_location'))
 
-with col2:
-  st.markdown("""
+    with col2:
+      costs = narrative()['cost_by_location']
+      ranking = [f'{location} at ₹{cost:,.0f}' for location, cost in costs['mean'].items()]
+      extremes = (f"""- **{costs.index[0]} tops the list with the highest average cost per plate at {interval(costs.iloc[0], '₹{:,.0f}')}.**
+- **This is followed by {', '.join(ranking[1:3]) or 'no other location'}.**
+- **{costs.index[-1]} has the lowest average cost per plate at ₹{costs['mean'].iloc[-1]:,.0f}.**""" if len(costs) else '')
+      st.markdown(f"""
 - The visualization displays the average cost per plate across various locations.
 - It appears that certain locations tend to have higher average costs per plate compared to others.
-- **Church Street tops the list with the highest average cost per plate at ₹711.**
-- **This is followed by Brigade Road at ₹702 , MG Road at ₹700.**
-- **Banashankri has the lowest average cost per plate at ₹336.**
+{extremes}
 - Understanding these variations can be useful for both customers and restaurant owners.
 - Customers can plan their dining budgets accordingly based on the average costs in different locations.
 - For restaurant owners, this information can guide pricing strategies, especially when considering opening new establishments or adjusting menu prices in existing ones.
 - Additionally, it underscores the importance of considering location-specific factors when analyzing cost dynamics in the restaurant industry.""")
-st.divider()
-
-col1,col2 = st.columns(2)
+    st.divider()
 
-with col1:
-    indexing = df[df['location'].str.contains('others')].index
-    temp = df.copy()
-    temp.drop(index=indexing, inplace=True)
+    col1,col2 = st.columns(2)
 
-    temp_df = pd.crosstab(temp['location'], temp['cost_category'])
-    fig = px.bar(temp_df, x=temp_df.index, y=temp_df.columns,
-                 title='Distribution of Cost Categories Among Restaurants Across Locations')
-    st.plotly_chart(fig)
+    with col1:
+        st.plotly_chart(chart('cost_category_by_location'))
 
-with col2:
-    st.markdown("""
+    with col2:
+        st.markdown("""
     - It provides insights into the affordability and pricing diversity of dining options in various areas.
     - Some locations may have a higher concentration of restaurants falling into specific cost categories, indicating potential dining preferences or economic demographics.
     - Understanding these patterns can help customers make informed decisions about where to dine based on their budget and desired dining experience.
     - For restaurant owners and investors, this data can inform strategic decisions regarding pricing strategies, menu offerings, and location selection to cater to the preferences and affordability levels of the target market in each location.""")
 
-st.divider()
+    st.divider()
 
-col1,col2 = st.columns(2)
+    col1,col2 = st.columns(2)
 
-with col1:
+    with col1:
 
-    temp = (df.groupby('location')['votes'].mean()).round(2).sort_values(ascending=False).reset_index()
-    temp.drop(index=temp[temp['location'] == 'others'].index, inplace=True)
-    fig = px.bar(temp, x='location', y='votes', color='location', text_auto=True, hover_name= 'location',
-                 title='Average Restaurant Voting on Different Location')
-    st.plotly_chart(fig)
+        st.plotly_chart(chart('votes_by_location'))
 
-with col2:
-    temp = (df.groupby('location')['rate'].mean()).round(2).sort_values(ascending=False).reset_index()
-    temp.drop(index=temp[temp['location'] == 'others'].index, inplace=True)
-    fig = px.bar(temp, x='location', y='rate', color='location', text_auto=True,hover_name= 'location',
-                 title='Average Restaurant Rating on Different Location')
-    st.plotly_chart(fig)
+    with col2:
+        st.plotly_chart(chart('rate_by_location'))
 
 
-st.markdown("""
+    st.markdown("""
 - Certain locations may have a higher average number of votes, indicating greater customer engagement and potentially higher levels of patronage.
 - This suggests that some areas may be more popular dining destinations or have a higher density of restaurants attracting more attention from customers.
 - Understanding the distribution of votes across locations can help customers in choosing dining destinations and assist restaurant owners in evaluating the performance of their establishments relative to competitors in the same area.
@@ -383,195 +597,152 @@ st.markdown("""
 - **Targeted Marketing:** Owners can tailor marketing efforts based on the popularity of their restaurant's location. If the area has a high average number of votes, they can leverage this popularity in advertising campaigns to attract more customers.
 - **Expansion Opportunities:** Analyzing locations with high levels of customer engagement can inform decisions about where to open new branches or expand existing ones. Areas with a strong track record of votes may present good opportunities for business growth.
 """)
-st.divider()
+    st.divider()
 
 
-temp = pd.crosstab(df['rest_type'], df['location'])
+    st.plotly_chart(chart('rest_type_by_location'))
+    st.divider()
 
-fig = px.imshow(temp,title='Location-wise Distribution of Restaurant types', color_continuous_scale='cividis', height=600, width=900)
-fig.update_layout(yaxis = dict(title = 'restaurant type'))
-st.plotly_chart(fig)
-st.divider()
+    similar_neighborhoods()
+    st.divider()
 
+    opening_opportunities()
 
-# Cuisines
-st.subheader("3. Cuisine: Tailoring Menu Offerings to Local Tastes for New Restaurant Ventures")
-st.markdown("""- This title highlights the importance of understanding popular cuisines in the area for guiding menu planning and catering to local preferences, which is essential for prospective restaurant ventures""")
+def cuisine_analysis():
+    # Cuisines
+    st.subheader("3. Cuisine: Tailoring Menu Offerings to Local Tastes for New Restaurant Ventures")
+    st.markdown("""- This title highlights the importance of understanding popular cuisines in the area for guiding menu planning and catering to local preferences, which is essential for prospective restaurant ventures""")
 
-col1,col2 = st.columns(2)
+    col1,col2 = st.columns(2)
 
-with col1:
-  indexing = df[df['cuisines'].str.contains('others')].index
-  temp= df.copy()
-  temp.drop(index = indexing,inplace = True)
-  temp_df = ((pd.crosstab(temp['online_order'],temp['cuisines'],normalize = 'index')*100).round())
-  fig = px.imshow(temp_df, color_continuous_scale = 'viridis',title = 'Percentage Distribution of Restaurant Cuisines by Online/Offline Ordering Preference"')
-  st.plotly_chart(fig)
+    with col1:
+      st.plotly_chart(chart('cuisines_by_online_order'))
 
-with col2:
-    st.markdown("""
-- **North Indian, South Indian, and Chinese** cuisines emerge as the most commonly ordered or favored cuisines, whether through online or offline orders in Bangalore.
+    with col2:
+        st.markdown(f"""
+- The most commonly ordered or favored cuisines in Bangalore are {leading(narrative()['cuisines_by_online_order'], 'online ordering')}.
 - These popular cuisines maintain their dominance regardless of whether the orders are placed online or offline. This suggests that customer preferences for these cuisines remain consistent across different ordering methods.
 - Understanding the popularity of specific cuisines across different ordering channels can guide restaurants in adapting their menus and services to meet the demands of the market effectively.""")
 
-st.divider()
+    st.divider()
 
-col1,col2 = st.columns(2)
+    col1,col2 = st.columns(2)
 
-with col1:
-    temp = df.copy()
-    indexing = df[df['cuisines'].str.contains('others')].index
-    temp.drop(index=indexing, inplace=True)
-    temp_df = (pd.crosstab(temp['book_table'],temp['cuisines'],normalize = 'index')*100).round()
-    fig = px.imshow(temp_df,color_continuous_scale = 'jet',title = 'Percentage Distribution of Restaurant Cuisines by Table Booking Availability')
-    st.plotly_chart(fig)
+    with col1:
+        st.plotly_chart(chart('cuisines_by_book_table'))
 
-with col2:
-    st.markdown("""
-- The data indicates that regardless of whether restaurants offer table booking facilities or not, **North Indian, South Indian, and Chinese cuisines** are consistently favored or commonly ordered.
+    with col2:
+        st.markdown(f"""
+- The most favored or commonly ordered cuisines are {leading(narrative()['cuisines_by_book_table'], 'table booking')}.
 - This suggests that the availability of table booking facilities doesn't significantly influence the popularity of these cuisines.
 - Therefore, restaurants specializing in these cuisines may focus on other aspects of their operations besides table booking to attract and retain customers.
 - However, a helpful tip for new restaurants is to consider offering these cuisines if they plan to provide table booking. This strategy can attract more customers and make the restaurant more competitive.""")
 
-st.divider()
+    st.divider()
 
-col1 , col2 = st.columns(2)
-with col1:
-  # Calculate less crowded and more crowded places
-  temp = df['location'].value_counts().reset_index()
-  temp.drop(index=1, inplace=True)
-  temp = temp.reset_index(drop=True)
+    col1 , col2 = st.columns(2)
+    with col1:
+      st.plotly_chart(chart('less_crowded_cuisines'))
 
-  less_crowded = temp[temp['count'] <= temp['count'].quantile(0.5)]['location'].tolist()
-  more_crowded = temp[temp['count'] > temp['count'].quantile(0.5)]['location'].tolist()
+    with col2:
+      st.plotly_chart(chart('more_crowded_cuisines'))
 
-  # Filter data for less crowded and more crowded places
-  temp1 = df[df['location'].isin(less_crowded)]
-  temp2 = df[df['location'].isin(more_crowded)]
+    st.divider()
 
-  # Remove 'others' from cuisines
-  indexing1 = temp1[temp1['cuisines'].str.contains('others')].index
-  indexing2 = temp2[temp2['cuisines'].str.contains('others')].index
+    st.plotly_chart(chart('cuisines_by_rest_type'))
+    st.divider()
 
-  temp1.drop(index=indexing1, inplace=True)
-  temp2.drop(index=indexing2, inplace=True)
 
-  # Calculate cross-tabulation for both subsets
-  temp_df1 = pd.crosstab(temp1['location'], temp1['cuisines'])
-  temp_df2 = pd.crosstab(temp2['location'], temp2['cuisines'])
-
-  fig = px.imshow(temp_df1,color_continuous_scale='viridis')
-  fig.update_layout(title='Less Crowded Places and Preferred Cuisines')
-  st.plotly_chart(fig)
-
-with col2:
-  fig = px.imshow(temp_df2,color_continuous_scale='viridis')
-  fig.update_layout(title='More Crowded Places and Preferred Cuisines')
-  st.plotly_chart(fig)
-
-st.divider()
-
-temp = df.copy()
-indexing = df[df['cuisines'].str.contains('others') | df['rest_type'].str.contains('others')].index
-temp.drop(index=indexing, inplace=True)
-temp_df = (pd.crosstab(temp['rest_type'],temp['cuisines'],normalize ='columns')*100).round()
-fig = px.imshow(temp_df,color_continuous_scale = 'jet',height = 500, title = 'Distribution of Cuisines by Restaurant Type')
-fig.update_layout(width=1100,height = 600)
-fig.update_layout(yaxis = dict(title= 'Restaurant Type'))
-st.plotly_chart(fig)
-st.divider()
-
-
-st.markdown("""
-- Restaurants serving **North Indian ,Chinese and South Indian** cuisines are the most popular choices among customers, in different rate and vote_category.
+    stats = narrative()
+    st.markdown(f"""
+- Restaurants serving **{join(stats['cuisines'])}** cuisines are the most popular choices among customers{', in every rate and vote_category' if same([stats['cuisines'], *stats['cuisines_by_rating']]) else ' overall, though the leaders shift between rate and vote categories'}.
 - This indicates that diners highly appreciate these cuisines. Such restaurants have a great opportunity to attract more customers and become preferred dining spots.""")
 
-temp = df.copy()
-indexing = df[df['cuisines'].str.contains('others')].index
-temp.drop(index=indexing, inplace=True)
+    st.plotly_chart(chart('cuisines_by_rate_and_vote'))
 
-temp_df1 = pd.crosstab(temp['rate_category'], temp['cuisines'])
-temp_df2 = pd.crosstab(temp['vote_category'], temp['cuisines'])
+    st.divider()
 
-# Create subplots
-fig = make_subplots(rows=2, cols=1, subplot_titles=("Rate Category vs. Cuisine", "Vote Category vs. Cuisine"),shared_xaxes = True)
+    col1,col2 = st.columns(2)
 
-fig.add_trace(go.Heatmap(x=temp_df1.columns, y=temp_df1.index, z=temp_df1.values, colorscale='plasma'), row=1, col=1)
+    with col1:
+        st.plotly_chart(chart('cuisine_counts'))
 
-fig.add_trace(go.Heatmap(x=temp_df2.columns, y=temp_df2.index, z=temp_df2.values, colorscale='plasma'), row=2, col=1)
+    with col2:
+        cuisine_lookup()
 
-fig.update_layout(width=1000,height = 600)
+    st.divider()
 
-st.plotly_chart(fig)
+    cuisine_combinations()
 
-st.divider()
+    st.divider()
 
-st.subheader("4. Rating and Votes: Harnessing Customer Feedback for Restaurant Success")
-st.markdown("""
+def rating_and_votes():
+    st.subheader("4. Rating and Votes: Harnessing Customer Feedback for Restaurant Success")
+    st.markdown("""
 - This title emphasizes the significance of high ratings and a large number of votes in indicating customer satisfaction and popularity. It underscores how leveraging customer feedback can offer valuable insights into a restaurant's potential success""")
 
-col1,col2 = st.columns(2)
+    rating_scatters()
 
-with col1:
-    fig = px.scatter(df, x='votes', y='rate', color='votes', color_continuous_scale='plasma', title=' Restaurant Rating vs Votes')
-    fig.update_layout(yaxis = dict(title = 'Rating'))
-    st.plotly_chart(fig)
-    st.write('- As restaurants rating increases , number of votes also increases.')
+    st.divider()
 
-with col2:
-    fig = px.scatter(df, x='avg_cost_per_plate', y='rate', color='votes', color_continuous_scale='plasma', title=' Restaurant Rating vs Avg. cost per plate')
-    fig.update_layout(xaxis=dict(title='avgerage cost per plate'), yaxis=dict(title='Rating'))
-    st.plotly_chart(fig)
-    st.write('- As restaurants rating increases , avg. cost per plate also increases')
+    st.plotly_chart(chart('vote_category_by_rest_type'))
 
-st.divider()
+    st.divider()
 
-temp = pd.crosstab(df['vote_category'],df['rest_type'])
-fig = px.bar(temp, x= temp.index, y = temp.columns , barmode = 'group',title = 'Vote Category vs Restaurant type')
-fig.update_layout(xaxis=dict(title= 'vote category'), yaxis=dict(title= 'Restaurant type'))
-st.plotly_chart(fig)
+def restaurant_type():
+    st.subheader('5. Type of Restaurant (Rest Type)')
+    st.markdown(""" - The type of restaurant (e.g., Casual Dining, Quick Bites) can influence the ambiance, menu offerings, and target audience.""")
 
-st.divider()
+    col1,col2 = st.columns(2)
 
-st.subheader('5. Type of Restaurant (Rest Type)')
-st.markdown(""" - The type of restaurant (e.g., Casual Dining, Quick Bites) can influence the ambiance, menu offerings, and target audience.""")
+    with col1:
+        st.plotly_chart(chart('cost_by_rest_type'))
 
-col1,col2 = st.columns(2)
-
-with col1:
-    temp = (df.groupby('rest_type')['avg_cost_per_plate'].mean()).round().sort_values(ascending=False).reset_index()
-    temp.drop(index=temp[temp['rest_type'] == 'others'].index, inplace=True)
-    fig = px.bar(temp, x='rest_type', y='avg_cost_per_plate', color='rest_type', text_auto=True, title='Average cost per plate on different Restaurant type')
-    fig.update_layout(yaxis = dict(title = 'Average cost per plate'), xaxis = dict(title = 'Restaurant Type'))
-    st.plotly_chart(fig)
-
-with col2:
-    st.markdown("""
+    with col2:
+        cost = narrative()['cost_by_rest_type']
+        highest = [f'{name} at {interval(row, "₹{:,.0f}")}' for name, row in cost.head(3).iterrows()] or ['No restaurant type']
+        lowest = cost.index.astype(str)[3:][-2:]
+        st.markdown(f"""
 - The analysis provides insights into the average cost per plate across different restaurant types.
-- Casual Dining with a Bar has the highest average cost per plate, followed by Casual Dining and Cafe.
-- Quick Bites and Bakery establishments have relatively lower average costs per plate.
+- {highest[0]} has the highest average cost per plate{f', followed by {join(highest[1:])}' if len(highest) > 1 else ''}.
+- {f'{join(lowest)} establishments have the lowest average costs per plate.' if len(lowest) else 'Too few restaurant types are selected to name the cheapest ones.'}
 - Understanding these variations can assist both customers and restaurant owners in making informed decisions.
 - **Pricing Strategies:** Owners can adjust their pricing strategies based on the average cost per plate within their restaurant type category. For example, if they operate a Casual Dining establishment, they may consider setting prices in line with the average cost per plate for Casual Dining restaurants.
 - **Menu Planning:** Understanding the average cost per plate for different restaurant types can guide menu planning. Owners can optimize their menu offerings to align with customer expectations and pricing norms within their restaurant category.""")
 
 
-col1,col2 = st.columns(2)
-
-with col1:
-    temp = (df.groupby('rest_type')['rate'].mean()).round(2).sort_values(ascending=False).reset_index()
-    temp.drop(index=temp[temp['rest_type'] == 'others'].index, inplace=True)
-    fig = px.bar(temp, x='rest_type', y='rate', color='rest_type', text_auto=True,title='Average Rating of different Restaurant type')
-    fig.update_layout(xaxis=dict(title='Restaurant Type'))
-    st.plotly_chart(fig)
-
-with col2:
-    temp = (df.groupby('rest_type')['votes'].mean()).round(2).sort_values(ascending=False).reset_index()
-    temp.drop(index=temp[temp['rest_type'] == 'others'].index, inplace=True)
-    fig = px.bar(temp, x='rest_type', y='votes', color='rest_type', text_auto=True,title='Average Voting of different Restaurant type')
-    fig.update_layout(xaxis=dict(title='Restaurant Type'))
-    st.plotly_chart(fig)
-
-st.divider()
+    col1,col2 = st.columns(2)
+
+    with col1:
+        st.plotly_chart(chart('rate_by_rest_type'))
+
+    with col2:
+        st.plotly_chart(chart('votes_by_rest_type'))
+
+    st.divider()
+
+renderers = dict(zip(SECTIONS, [basic_insights, online_and_table_booking, location_analysis, cuisine_analysis,
+                                 rating_and_votes, restaurant_type]))
+if section != SECTIONS[0]:
+    st.markdown(
+        f"""
+        <h1 style='text-align: center; font-family: Arial, sans-serif;'>Insights for Opening New Restaurant</h1>
+        """,
+        unsafe_allow_html=True
+    )
+with nullcontext() if profiler is None else profiler.block('section', section):
+    renderers[section]()
+
+if profiler is not None:
+    profiler.run.update(section=section, filters=filter_state)
+    profiler.end_run()
+    with st.sidebar.expander('Profiling', expanded=True):
+        records = profiler.run['records']
+        st.caption(f"Last rerun {profiler.run['seconds']:.2f}s, "
+                   f"{sum(r.get('bytes', 0) for r in records) / 2**10:,.0f} KB of chart/table payloads")
+        st.dataframe(records, hide_index=True)
+        st.download_button('Download session profile (JSON)', profiler.to_json(),
+                           file_name='profile.json', mime='application/json')
 
 st.write(
     "For more in-depth insights, visit my Kaggle notebook [here](https://www.kaggle.com/code/rajeevnayantripathi/data-cleaning-eda-on-zomato-bangalore-dataset)")
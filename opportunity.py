@@ -0,0 +1,200 @@
+import argparse
+import json
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from combos import token_matrix
+from cuisine_index import CuisineIndex
+from data import DATA_PATH
+from store import STORE
+
+AXES = ['location', 'cuisines', 'rest_type', 'cost_category']
+WEIGHTS = {'gap': 1.0, 'rating': 0.5, 'votes': 0.5}
+# Listings' worth of prior pulling a thin cell's mean rating / votes toward its combination's city-wide mean
+PRIOR = 10
+TOP = 20
+# Most cells one query may return
+MAX_K = 100
+# Cells expecting fewer listings than this are too small to call under-served
+MIN_EXPECTED = 1.0
+CACHE_SIZE = 4096
+
+
+def zscore(values, valid):
+    mean, std = values[valid].mean(), values[valid].std()
+    return (values - mean) / (std if std > 0 else 1)
+
+
+class OpportunityIndex:
+    # location x cuisine x rest_type x cost_category tensors built once from the cube, so a query is a slice,
+    # a weighted sum and a partial sort. Per cell:
+    #   supply   - listings serving the cuisine with that type and price band in the location
+    #   expected - listings it would have if the combination were spread over locations like listings overall
+    #   gap      - log(1 + expected) - log(1 + supply): positive where the location is under-served
+    #   rating, votes - mean per listing, shrunk toward the combination's city-wide mean by PRIOR listings
+    #                   (so empty cells take the city-wide value); scored as z-scores, votes on a log scale
+
+    def __init__(self, cube, cuisines, exclude=('others',)):
+        matrix, vocabulary = token_matrix(cuisines, exclude)
+        self.labels = {'location': cube['location'].cat.categories, 'cuisines': vocabulary,
+                       'rest_type': cube['rest_type'].cat.categories, 'cost_category': cube['cost_category'].cat.categories}
+        codes = [cube[axis].cat.codes.to_numpy() for axis in ['location', 'rest_type', 'cost_category']]
+        shape = [len(self.labels[axis]) for axis in ['location', 'rest_type', 'cost_category']]
+        group = np.ravel_multi_index(codes, shape)
+        onehot = sparse.csr_matrix((np.ones(len(cube)), (group, np.arange(len(cube)))), shape=(np.prod(shape), len(cube)))
+
+        def tensor(weights):
+            # (location, rest_type, cost) x cuisine sums -> location x cuisine x rest_type x cost
+            table = (onehot @ sparse.diags(weights.to_numpy('float64')) @ matrix).toarray()
+            return table.reshape(*shape, len(vocabulary)).transpose(0, 3, 1, 2)
+
+        self.supply = tensor(cube['count'])
+        rate, votes = tensor(cube['rate_sum']), tensor(cube['votes_sum'])
+        listings = cube.groupby('location', observed=False)['count'].sum().to_numpy('float64')
+        combination = self.supply.sum(axis=0)
+        self.expected = listings[:, None, None, None] * combination / max(listings.sum(), 1)
+        # Cells worth ranking: the combination exists somewhere, and neither location nor type is 'others'
+        self.valid = np.broadcast_to(combination > 0, self.supply.shape).copy()
+        for axis in ['location', 'rest_type']:
+            keep = ~self.labels[axis].isin(exclude)
+            self.valid &= keep.reshape([-1 if a == axis else 1 for a in AXES])
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            city_rate = rate.sum(axis=0) / combination
+            city_votes = votes.sum(axis=0) / combination
+        self.rating = (rate + PRIOR * np.nan_to_num(city_rate)) / (self.supply + PRIOR)
+        self.votes = (votes + PRIOR * np.nan_to_num(city_votes)) / (self.supply + PRIOR)
+        self.gap = np.log1p(self.expected) - np.log1p(self.supply)
+        # One row per WEIGHTS key over the flattened cells, so scoring a query is a single (weights @ features)
+        self.features = np.stack([self.gap.ravel(), zscore(self.rating, self.valid).ravel(),
+                                  zscore(np.log1p(self.votes), self.valid).ravel()])
+
+    def positions(self, axis, values):
+        if values is None:
+            return np.arange(len(self.labels[axis]))
+        positions = self.labels[axis].get_indexer(values)
+        if (positions < 0).any():
+            raise ValueError(f'unknown {axis}: {", ".join(np.asarray(values)[positions < 0])}')
+        return positions
+
+    def cells(self, filters):
+        # Flat ids of the cells matching every filter (None: the whole tensor)
+        if all(values is None for values in filters):
+            return None
+        grid = np.ix_(*[self.positions(axis, values) for axis, values in zip(AXES, filters)])
+        return np.ravel_multi_index(grid, self.supply.shape).ravel()
+
+    def query(self, location=None, cuisines=None, rest_type=None, cost_category=None, k=TOP, weights=None,
+              min_expected=MIN_EXPECTED):
+        # Top k under-served cells among the given labels (None: all), best first
+        if not 1 <= k <= MAX_K:
+            raise ValueError(f'k must be between 1 and {MAX_K}')
+        weights = {**WEIGHTS, **(weights or {})}
+        ids = self.cells([location, cuisines, rest_type, cost_category])
+        features = self.features if ids is None else self.features[:, ids]
+        rankable = self.valid.ravel() & (self.expected.ravel() >= min_expected)
+        score = np.where(rankable if ids is None else rankable[ids], np.array([weights[name] for name in WEIGHTS]) @ features,
+                         -np.inf)
+        k = min(k, int(np.isfinite(score).sum()))
+        top = np.argpartition(-score, k - 1)[:k] if k else np.array([], dtype='int64')
+        top = top[np.argsort(-score[top], kind='stable')]
+        cells = np.unravel_index(top if ids is None else ids[top], self.supply.shape)
+        return pd.DataFrame({
+            **{axis: self.labels[axis][c] for axis, c in zip(AXES, cells)},
+            'supply': self.supply[cells].round().astype('int64'),
+            'expected': self.expected[cells].round(1),
+            'rating': self.rating[cells].round(2),
+            'votes': self.votes[cells].round(),
+            'score': score[top].round(3),
+        })
+
+
+def opportunities(cube, cuisines=None, **query):
+    # One-off helper: builds the index from a cube (and its CuisineIndex) and runs one query
+    return OpportunityIndex(cube, cuisines or CuisineIndex(cube['cuisines'])).query(**query)
+
+
+def parse_query(text):
+    # ?location=BTM,HSR&cuisines=Chinese&rest_type=...&cost_category=low&k=10&min_expected=2&gap=1&rating=0.5&votes=0.5
+    params = {key: ','.join(values) for key, values in parse_qs(text).items()}
+    query = {axis: params[axis].split(',') for axis in AXES if axis in params}
+    if 'k' in params:
+        query['k'] = int(params['k'])
+    if 'min_expected' in params:
+        query['min_expected'] = float(params['min_expected'])
+    weights = {name: float(params[name]) for name in WEIGHTS if name in params}
+    if weights:
+        query['weights'] = weights
+    unknown = set(params) - {*AXES, 'k', 'min_expected', *WEIGHTS}
+    if unknown:
+        raise ValueError(f'unknown parameter: {", ".join(sorted(unknown))}')
+    return query
+
+
+def opportunity_index(snapshot):
+    return OpportunityIndex(snapshot.aggregates['cube'], CuisineIndex(snapshot.aggregates['cube']['cuisines']))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def answer(path, fingerprint, text):
+    # JSON body of one query for one dataset version; equal queries spelled in another parameter order share it
+    index = STORE.get(path).derive('opportunities', opportunity_index)
+    table = index.query(**parse_query(text))
+    return json.dumps({'results': table.to_dict(orient='records')}).encode()
+
+
+class OpportunityHandler(BaseHTTPRequestHandler):
+    # GET /opportunities?<parse_query parameters>; keep-alive, so a planning tool can reuse one connection
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in two writes; without this, delayed ACKs stall every keep-alive response ~40ms
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != '/opportunities':
+            return self.reply(404, {'error': 'not found'})
+        path = self.server.dataset
+        canonical = '&'.join(sorted(url.query.split('&'))) if url.query else ''
+        try:
+            body = answer(path, STORE.get(path).fingerprint, canonical)
+        except ValueError as error:
+            return self.reply(400, {'error': str(error)})
+        self.reply(200, body)
+
+    def reply(self, status, body):
+        body = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(path=DATA_PATH, host='127.0.0.1', port=8765):
+    STORE.get(path).derive('opportunities', opportunity_index)
+    server = ThreadingHTTPServer((host, port), OpportunityHandler)
+    server.dataset = path
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve under-served location x cuisine x type x price band cells as JSON.')
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    server = serve(args.data, args.host, args.port)
+    print(f'http://{args.host}:{args.port}/opportunities?cuisines=Chinese&k=5')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
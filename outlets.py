@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+# A restaurant is listed once per listing type (Buffet, Cafes, Delivery, ...); listings sharing these are one
+# outlet. Cost is the featured cost per plate (cost for two over the cuisine count, which an outlet shares)
+OUTLET_KEY = ['name', 'location', 'rest_type', 'avg_cost_per_plate']
+UNITS = {'listings': 'Listings', 'outlets': 'Unique outlets'}
+
+
+class OutletIndex:
+    # Listing -> outlet id and outlet -> chain id. Outlet keys are hashed to one uint64 per listing and
+    # factorized, so building it is a hash pass over the rows instead of a multi-column sort; a 64-bit
+    # collision between two outlets is vanishingly unlikely at these sizes. Chains are outlets sharing a name.
+
+    def __init__(self, df):
+        keys = pd.util.hash_pandas_object(df[OUTLET_KEY], index=False).to_numpy()
+        self.outlets, _ = pd.factorize(keys)
+        self.outlets = self.outlets.astype('int32')
+        # Representative listing of every outlet: its most voted one (votes are scraped per listing and drift)
+        order = np.lexsort((-df['votes'].to_numpy('int64'), self.outlets))
+        first = np.r_[True, self.outlets[order][1:] != self.outlets[order][:-1]]
+        self.first = order[first]
+        self.chains = df['name'].cat.codes.to_numpy()[self.first]
+        self.listings = np.bincount(self.outlets)
+
+    def __len__(self):
+        return len(self.first)
+
+    def frame(self, df):
+        # One row per outlet, with how many listings it had
+        return df.iloc[self.first].reset_index(drop=True).assign(listings=self.listings.astype('int16'))
+
+    def select(self, mask):
+        # Outlets with at least one selected listing
+        selected = np.zeros(len(self), dtype=bool)
+        selected[self.outlets[mask]] = True
+        return selected
+
@@ -0,0 +1,134 @@
+import cProfile
+import json
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Runs kept per session for the debug panel / export
+MAX_RUNS = 50
+# Packages whose time counts as data work vs figure building in the detailed split
+PANDAS_PACKAGES = {'pandas', 'numpy', 'scipy', 'pyarrow'}
+FIGURE_PACKAGES = {'plotly', '_plotly_utils'}
+
+
+def package_of(filename):
+    # Top-level package of an installed module, None for builtins, the stdlib and this app
+    marker = f'site-packages{os.sep}'
+    if marker not in filename:
+        return None
+    return filename.split(marker, 1)[1].split(os.sep, 1)[0].split('.', 1)[0]
+
+
+def library_split(profile):
+    # Seconds of own time per side; builtins and stdlib helpers (copy, re, ...) are charged to the
+    # package of their heaviest caller, so numpy ufuncs count as pandas and deepcopy as plotly
+    stats = pstats.Stats(profile).stats
+    owners = {}
+
+    def owner(func, seen=()):
+        if func not in owners:
+            package = package_of(func[0])
+            # Recursion (deepcopy -> _deepcopy_dict -> deepcopy) is skipped when looking for the caller
+            callers = {caller: values for caller, values in stats.get(func, (0, 0, 0, 0, {}))[4].items()
+                       if caller != func and caller not in seen}
+            if package is None and callers and len(seen) < 20:
+                heaviest = max(callers, key=lambda caller: callers[caller][3])
+                package = owner(heaviest, seen + (func,))
+            owners[func] = package
+        return owners[func]
+
+    split = {'pandas_s': 0.0, 'figure_s': 0.0, 'other_s': 0.0}
+    for func, (_, _, own_time, _, _) in stats.items():
+        package = owner(func)
+        side = 'pandas_s' if package in PANDAS_PACKAGES else 'figure_s' if package in FIGURE_PACKAGES else 'other_s'
+        split[side] += own_time
+    return {side: round(seconds, 4) for side, seconds in split.items()}
+
+
+def figure_bytes(fig):
+    # What st.plotly_chart ships: the figure's JSON spec
+    return len(fig.to_json().encode())
+
+
+def table_bytes(frame):
+    # What st.dataframe ships: the frame as Arrow IPC bytes
+    from streamlit.type_util import data_frame_to_bytes
+    return len(data_frame_to_bytes(frame))
+
+
+class Profiler:
+    # Per-session recorder of rerun timings. 'timing' records wall time and payload bytes;
+    # 'detail' also runs every measured block under cProfile (pandas vs figure split) and tracemalloc
+    # (peak allocation), which slows the page down noticeably, so it is only for investigations
+
+    def __init__(self, session_id=None, level='timing'):
+        self.session_id = session_id
+        self.level = level
+        self.runs = []
+        self.run = None
+
+    def start_run(self, **labels):
+        self.run = {'started': time.time(), **labels, 'records': []}
+        self.runs.append(self.run)
+        del self.runs[:-MAX_RUNS]
+        if self.level == 'detail' and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def end_run(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        if self.run is not None:
+            self.run['seconds'] = round(time.time() - self.run['started'], 4)
+            logger.info('profile %s', json.dumps({'session': self.session_id, **self.run}))
+
+    def record(self, kind, name, **values):
+        record = {'kind': kind, 'name': name, **values}
+        if self.run is not None:
+            self.run['records'].append(record)
+        return record
+
+    @contextmanager
+    def block(self, kind, name):
+        # Wall time of a whole block, e.g. a section including sending its elements
+        record = self.record(kind, name)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = round(time.perf_counter() - start, 4)
+
+    def measure(self, kind, name, build, payload=None, **values):
+        # Runs build(); payload(value) gives the bytes the element will send
+        record = self.record(kind, name, **values)
+        detail = self.level == 'detail'
+        # Fragment reruns measure outside of a full run, so tracing may have to be started here
+        own_trace = detail and not tracemalloc.is_tracing()
+        if own_trace:
+            tracemalloc.start()
+        if detail:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            profile = cProfile.Profile()
+            profile.enable()
+        start = time.perf_counter()
+        try:
+            value = build()
+        finally:
+            record['seconds'] = round(time.perf_counter() - start, 4)
+            if detail:
+                profile.disable()
+                record['peak_mb'] = round((tracemalloc.get_traced_memory()[1] - baseline) / 2**20, 2)
+                record.update(library_split(profile))
+            if own_trace:
+                tracemalloc.stop()
+        if payload is not None:
+            record['bytes'] = payload(value)
+        return value
+
+    def to_json(self):
+        return json.dumps({'session': self.session_id, 'runs': self.runs}, indent=1)
@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import plotly
+from plotly.offline import get_plotlyjs
+
+from aggregates import DIMENSIONS, build_aggregates, read_or_build_aggregates, rollup
+from charts import CHARTS, ChartData, book_table_summary, online_order_summary
+from cuisine_index import CuisineIndex
+from data import read_dataset, sidecar_path
+from features import add_features
+from ingest import CHUNK_ROWS, read_or_stream_aggregates, stream_breakpoints, stream_densities
+from outlets import UNITS, OutletIndex
+
+# Report sections, same order and chart ids as the Streamlit page
+SECTIONS = {
+    'Basic Insights': ['top_restaurants', 'crowded_locations', 'online_order_share', 'book_table_share'],
+    'Online Ordering & Table Booking': ['online_order_by_location', 'online_order_treemap', 'book_table_treemap',
+                                        'online_order_by_rest_type', 'book_table_by_location'],
+    'Location': ['cost_by_location', 'cost_category_by_location', 'votes_by_location', 'rate_by_location',
+                 'rest_type_by_location', 'neighborhood_similarity'],
+    'Cuisine': ['cuisines_by_online_order', 'cuisines_by_book_table', 'less_crowded_cuisines',
+                'more_crowded_cuisines', 'cuisines_by_rest_type', 'cuisines_by_rate_and_vote', 'cuisine_counts',
+                'cuisine_cooccurrence'],
+    'Rating & Votes': ['rating_vs_votes', 'rating_vs_cost', 'vote_category_by_rest_type'],
+    'Restaurant Type': ['cost_by_rest_type', 'rate_by_rest_type', 'votes_by_rest_type'],
+}
+TOP_NAMES = 50
+
+
+def load_chart_data(path, chunksize=None, unit='listings'):
+    # The page's load path without Streamlit: typed dataset, features, saved aggregates, cuisine index.
+    # With a chunksize the csv is streamed instead and only its aggregates are ever held in memory.
+    # unit 'outlets' aggregates unique outlets instead of listings (in memory only)
+    if chunksize:
+        aggregates = read_or_stream_aggregates(path, chunksize)
+        cube = aggregates['cube']
+        data = ChartData(cube, cube, aggregates['names'], CuisineIndex(cube['cuisines']),
+                         densities=stream_densities(aggregates))
+        return data, stream_breakpoints(aggregates)
+    sidecar = sidecar_path(path)
+    df = read_dataset(path, sidecar)
+    breakpoints = add_features(df)
+    if unit == 'outlets':
+        df = OutletIndex(df).frame(df)
+        aggregates = build_aggregates(df)
+    else:
+        aggregates = read_or_build_aggregates(df, sidecar)
+    cube = aggregates['cube']
+    return ChartData(cube, cube, aggregates['names'], CuisineIndex(cube['cuisines']), frame=df), breakpoints
+
+
+def table_records(table):
+    return json.loads(table.reset_index().to_json(orient='records'))
+
+
+def report_aggregates(data, breakpoints):
+    return {
+        'rows': int(data.cube['count'].sum()),
+        'breakpoints': {name: values.tolist() for name, values in breakpoints.items()},
+        'online_order': table_records(online_order_summary(data)),
+        'book_table': table_records(book_table_summary(data)),
+        'rollups': {dimension: table_records(rollup(data.cube, dimension))
+                    for dimension in DIMENSIONS if dimension != 'cuisines'},
+        'cuisines': table_records(data.cuisines.counts(data.cube_weights())),
+        'top_restaurants': table_records(data.names.head(TOP_NAMES).set_index('name')),
+    }
+
+
+# Per worker process: the datasets it has loaded, so one load serves all charts of a city
+_loaded = {}
+
+
+def prepare(path, chunksize=None, unit='listings'):
+    # First task per dataset: writes the parquet sidecar and saved aggregates the chart tasks then read
+    data, breakpoints = load_chart_data(path, chunksize, unit)
+    return report_aggregates(data, breakpoints)
+
+
+def render(path, spec_id, chunksize=None, unit='listings'):
+    if path not in _loaded:
+        if len(_loaded) >= 2:
+            _loaded.pop(next(iter(_loaded)))
+        _loaded[path] = load_chart_data(path, chunksize, unit)[0]
+    start = time.perf_counter()
+    fig = CHARTS[spec_id](_loaded[path])
+    html = fig.to_html(full_html=False, include_plotlyjs=False, div_id=spec_id)
+    return html, time.perf_counter() - start
+
+
+def plotly_script(mode):
+    if mode == 'inline':
+        return f'<script type="text/javascript">{get_plotlyjs()}</script>'
+    return f'<script src="https://cdn.plot.ly/plotly-{plotly.offline.get_plotlyjs_version()}.min.js"></script>'
+
+
+def report_html(title, figures, script):
+    body = []
+    for section, spec_ids in SECTIONS.items():
+        body.append(f'<h2>{section}</h2>')
+        body.extend(figures[spec_id] for spec_id in spec_ids if spec_id in figures)
+    return (f'<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>{title}</title>\n{script}\n</head>\n'
+            f'<body style="font-family: Arial, sans-serif;">\n<h1 style="text-align: center;">{title}</h1>\n'
+            + '\n'.join(body) + '\n</body>\n</html>\n')
+
+
+def output_folder(out, path):
+    return os.path.join(out, os.path.splitext(os.path.basename(path))[0])
+
+
+def write_report(path, out, figures, aggregates, script):
+    folder = output_folder(out, path)
+    os.makedirs(folder, exist_ok=True)
+    title = f'{os.path.splitext(os.path.basename(path))[0]} Restaurant Analysis'
+    with open(os.path.join(folder, 'aggregates.json'), 'w', encoding='utf-8') as f:
+        json.dump(aggregates, f, indent=1)
+    with open(os.path.join(folder, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(report_html(title, figures, script))
+    return folder
+
+
+def build_reports(paths, out, workers=None, plotlyjs='cdn', chunksize=None, unit='listings'):
+    # Every dataset is prepared in parallel; once a dataset is prepared its charts are queued, so the
+    # pool renders charts of ready cities while others are still parsing their csv
+    script = plotly_script(plotlyjs)
+    spec_ids = [spec_id for ids in SECTIONS.values() for spec_id in ids]
+    figures = {path: {} for path in paths}
+    aggregates = {}
+    timings = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(prepare, path, chunksize, unit): (path, None) for path in paths}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, spec_id = pending.pop(future)
+                if spec_id is None:
+                    aggregates[path] = future.result()
+                    pending.update({pool.submit(render, path, spec_id, chunksize, unit): (path, spec_id) for spec_id in spec_ids})
+                    continue
+                figures[path][spec_id], timings[path, spec_id] = future.result()
+                if len(figures[path]) == len(spec_ids):
+                    print(write_report(path, out, figures.pop(path), aggregates.pop(path), script), flush=True)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the restaurant analysis as static HTML + JSON aggregates.')
+    parser.add_argument('datasets', nargs='+', help='cleaned csv files, one report per file')
+    parser.add_argument('--out', default='reports', help='output folder (one sub-folder per dataset)')
+    parser.add_argument('--workers', type=int, default=None, help='render processes (default: cpu count)')
+    parser.add_argument('--plotlyjs', choices=['cdn', 'inline'], default='cdn',
+                        help='load plotly.js from the cdn or embed it in every report')
+    parser.add_argument('--stream', action='store_true',
+                        help='read the csv in chunks, for dumps too big to load (memory bounded by --chunksize)')
+    parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS, help='rows per chunk with --stream')
+    parser.add_argument('--unit', choices=list(UNITS), default='listings',
+                        help='count every listing, or each outlet once (same restaurant listed under several types)')
+    args = parser.parse_args()
+    if args.stream and args.unit == 'outlets':
+        parser.error('--unit outlets needs the dataset in memory, it cannot be combined with --stream')
+
+    start = time.perf_counter()
+    timings = build_reports(args.datasets, args.out, args.workers, args.plotlyjs, args.chunksize if args.stream else None,
+                            args.unit)
+    slowest = sorted(timings.items(), key=lambda item: item[1], reverse=True)[:5]
+    print(f'{len(args.datasets)} report(s), {len(timings)} figures in {time.perf_counter() - start:.1f}s')
+    for (path, spec_id), seconds in slowest:
+        print(f'  {seconds:6.2f}s  {os.path.basename(path)}  {spec_id}')
+
+
+if __name__ == '__main__':
+    main()
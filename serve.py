@@ -0,0 +1,14 @@
+import sys
+
+from streamlit.web import cli
+
+from data import DATA_PATH
+from store import STORE
+
+# `python serve.py [streamlit run options]`: same as `streamlit run main.py`, but the shared dataset store
+# starts loading with the server instead of with the first session. Sessions run in this process, so they
+# find the store already warm (or wait on the load in progress instead of starting their own).
+if __name__ == '__main__':
+    STORE.warm(DATA_PATH)
+    sys.argv = ['streamlit', 'run', 'main.py', *sys.argv[1:]]
+    sys.exit(cli.main())
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+from aggregates import crosstab, rollup
+
+# Profile blocks of a location and their weight in the combined similarity
+WEIGHTS = {'cuisines': 0.4, 'rest_type': 0.25, 'cost_category': 0.2, 'rate': 0.15}
+METHODS = ['cosine', 'jensen-shannon']
+MAX_RATE = 5
+# Elements of the (rows x locations x features) tensor one Jensen-Shannon step may hold
+JS_BLOCK_ELEMENTS = 2**23
+
+
+def shares(table, locations):
+    table = table.set_axis(table.index.astype(str)).reindex(locations, fill_value=0).astype('float64')
+    totals = table.sum(axis=1).to_numpy()[:, None]
+    return table.div(np.where(totals > 0, totals, 1))
+
+
+def location_profiles(data, exclude=('others',)):
+    # location x feature matrix made of one share block per WEIGHTS key (each block row sums to 1, or is
+    # all zero): cuisine shares, restaurant type mix, cost category mix, and the mean rate as rate / MAX_RATE
+    # against its remainder, so it is a distribution like the rest
+    cube = data.cube
+    rate = rollup(cube, 'location')['rate'] / MAX_RATE
+    locations = pd.Index(rate.index.astype(str), name='location')
+    locations = locations[~locations.isin(exclude)]
+    blocks = {
+        'cuisines': data.cuisine_crosstab('location'),
+        'rest_type': crosstab(cube, 'location', 'rest_type'),
+        'cost_category': crosstab(cube, 'location', 'cost_category'),
+        'rate': pd.DataFrame({'rate': rate, 'rest': 1 - rate}),
+    }
+    return pd.concat({name: shares(block, locations) for name, block in blocks.items()}, axis=1).astype('float32')
+
+
+def cosine(p):
+    norms = np.linalg.norm(p, axis=1, keepdims=True)
+    p = p / np.where(norms > 0, norms, 1)
+    return p @ p.T
+
+
+def entropy(p):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return -np.where(p > 0, p * np.log2(p), 0).sum(axis=-1)
+
+
+def jensen_shannon(p):
+    # Base-2 JS divergence of every pair of rows, in [0, 1]; rows are processed in blocks so the
+    # pairwise mixture tensor stays under JS_BLOCK_ELEMENTS
+    n, d = p.shape
+    own = entropy(p)
+    divergence = np.empty((n, n), dtype='float32')
+    step = max(1, JS_BLOCK_ELEMENTS // max(n * d, 1))
+    for start in range(0, n, step):
+        block = p[start:start + step]
+        mixture = (block[:, None, :] + p[None, :, :]) / 2
+        divergence[start:start + step] = entropy(mixture) - (own[start:start + step, None] + own[None, :]) / 2
+    return np.clip(divergence, 0, 1)
+
+
+def similarity_matrix(profiles, method='cosine', weights=WEIGHTS):
+    # Weighted mean over the profile blocks of the per-block similarity (cosine, or 1 - JS divergence). A block
+    # with no feature in the selection (e.g. only 'others' cuisines) is not in the profiles and is left out
+    weights = {block: weight for block, weight in weights.items() if block in profiles.columns.get_level_values(0)}
+    total = np.zeros((len(profiles), len(profiles)), dtype='float32')
+    for block, weight in weights.items():
+        p = profiles[block].to_numpy('float32')
+        total += weight * (cosine(p) if method == 'cosine' else 1 - jensen_shannon(p))
+    total /= sum(weights.values()) or 1
+    return pd.DataFrame(total, index=profiles.index, columns=profiles.index)
+
+
+def most_similar(similarity, location, k=5):
+    row = similarity.loc[location].drop(location)
+    return row.nlargest(k).rename('similarity').reset_index()
+
+
+def spectral_order(similarity):
+    # Locations sorted along the second eigenvector of the similarity matrix, so similar ones sit together
+    if len(similarity) < 3:
+        return np.arange(len(similarity))
+    _, vectors = np.linalg.eigh(similarity.to_numpy('float64'))
+    return np.argsort(vectors[:, -2], kind='stable')
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+from features import QUARTILES, counted_quantiles
+
+# Relative error of a collapsed sketch, and how many distinct values it holds exactly before collapsing
+ACCURACY = 0.005
+MAX_VALUES = 10_000
+
+
+class QuantileSketch:
+    # Mergeable value -> count summary for quartile cut-points. Rate, votes and cost per plate are
+    # integer-valued with a few thousand distinct values at most, so the sketch is normally exact
+    # (same quartiles as the whole column). Past max_values distinct values it collapses to log-spaced
+    # buckets (DDSketch style): every value is then off by at most `accuracy` relative error, and the
+    # size stays bounded by the value range's order of magnitude instead of the row count.
+
+    def __init__(self, accuracy=ACCURACY, max_values=MAX_VALUES):
+        self.accuracy = accuracy
+        self.max_values = max_values
+        self.exact = True
+        self.counts = pd.Series(dtype='int64')
+
+    def __len__(self):
+        return int(self.counts.sum())
+
+    @property
+    def gamma(self):
+        return (1 + self.accuracy) / (1 - self.accuracy)
+
+    def snap(self, values):
+        # Bucket representative of every value; applying it twice changes nothing, so collapsed sketches merge
+        magnitude = np.abs(values)
+        with np.errstate(divide='ignore'):
+            keys = np.ceil(np.log(magnitude) / np.log(self.gamma))
+        snapped = np.sign(values) * 2 * self.gamma ** keys / (self.gamma + 1)
+        return np.where(magnitude > 0, snapped, 0.0)
+
+    def collapse(self):
+        self.exact = False
+        self.counts = self.add(None, pd.Series(self.counts.to_numpy(), index=self.snap(self.counts.index.to_numpy('float64'))))
+
+    @staticmethod
+    def add(total, counts):
+        counts = counts.groupby(level=0, sort=False).sum()
+        if total is None or not len(total):
+            return counts.astype('int64')
+        return pd.concat([total, counts]).groupby(level=0, sort=False).sum().astype('int64')
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if not self.exact:
+            values = self.snap(values)
+        self.counts = self.add(self.counts, pd.Series(values).value_counts())
+        if self.exact and len(self.counts) > self.max_values:
+            self.collapse()
+        return self
+
+    def merge(self, other):
+        if self.exact and not other.exact:
+            self.collapse()
+        counts = other.counts
+        if other.exact and not self.exact:
+            counts = pd.Series(counts.to_numpy(), index=self.snap(counts.index.to_numpy('float64')))
+        self.counts = self.add(self.counts, counts)
+        if self.exact and len(self.counts) > self.max_values:
+            self.collapse()
+        return self
+
+    def values(self):
+        return np.sort(self.counts.index.to_numpy('float64'))
+
+    def quantiles(self, quantiles=QUARTILES):
+        return counted_quantiles(self.counts, quantiles)
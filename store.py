@@ -0,0 +1,164 @@
+import threading
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+from aggregates import read_or_build_aggregates
+from data import apply_schema, check_listings, file_fingerprint, read_dataset, sidecar_path
+from features import add_features
+from incremental import IncrementalAggregates, appended_folder, load_appended, save_batch
+
+
+class Snapshot:
+    # One version of a dataset: the typed frame with its features, the category cut-points and the aggregates,
+    # plus anything derived from them on demand (indexes, bitmasks, ...). Shared by every session, so readers
+    # must treat it as read-only; a new dataset version is a new Snapshot, never an update of this one.
+    # source is the csv's file fingerprint; fingerprint also counts the listings appended since (see
+    # DatasetStore.append), so caches keyed by it see every append as a new version. df may be given as a
+    # function building it, which then runs on first read
+
+    def __init__(self, path, fingerprint, df, breakpoints, aggregates, source=None, sidecar=None, appended=0):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.source = fingerprint if source is None else source
+        self.sidecar = sidecar
+        self._df = df
+        self.breakpoints = breakpoints
+        self.aggregates = aggregates
+        # Number of listings appended to the csv's
+        self.appended = appended
+        self.derived = {}
+        self.locks = {}
+
+    @property
+    def df(self):
+        if callable(self._df):
+            return self.derive('df', lambda snapshot: snapshot._df())
+        return self._df
+
+    def derive(self, name, build):
+        # build(snapshot) runs once per snapshot, in the first session asking for it; others wait for its result
+        if name not in self.derived:
+            with self.locks.setdefault(name, threading.Lock()):
+                if name not in self.derived:
+                    self.derived[name] = build(self)
+        return self.derived[name]
+
+
+class LazyAggregates(Mapping):
+    # Aggregates whose pieces may be functions (e.g. per-listing cells still kept as append batches): each is
+    # built on its first read, once, and shared from then on
+
+    def __init__(self, pieces):
+        self.pieces = dict(pieces)
+        self.lock = threading.Lock()
+
+    def __getitem__(self, key):
+        if callable(self.pieces[key]):
+            with self.lock:
+                if callable(self.pieces[key]):
+                    self.pieces[key] = self.pieces[key]()
+        return self.pieces[key]
+
+    def __iter__(self):
+        return iter(self.pieces)
+
+    def __len__(self):
+        return len(self.pieces)
+
+
+def build_snapshot(path, fingerprint):
+    sidecar = sidecar_path(path)
+    df = read_dataset(path, sidecar)
+    appended = load_appended(appended_folder(sidecar))
+    if appended is None:
+        breakpoints = add_features(df)
+        return Snapshot(path, fingerprint, df, breakpoints, read_or_build_aggregates(df, sidecar), sidecar=sidecar)
+    # Listings appended before a restart: the frame is the csv plus those rows, bucketized with the cut-points
+    # the saved cube was built with. Unless a batch re-bucketized everything (base), the csv's listings are in
+    # the cube rows of the csv's own aggregates, and each batch's in the rows saved with it
+    breakpoints, rows = appended['breakpoints'], appended['rows']
+    base = appended['base']
+    if base is None:
+        add_features(df, breakpoints)
+        base = read_or_build_aggregates(df, sidecar)['cells']['cell'].to_numpy()
+    df = apply_schema(pd.concat([df, rows], ignore_index=True))
+    add_features(df, breakpoints)
+    aggregates = {
+        'cube': appended['cube'],
+        'cells': pd.DataFrame({'cell': np.concatenate([base, *appended['cells']])}),
+        'names': df['name'].value_counts().rename('count').reset_index(),
+    }
+    return Snapshot(path, (*fingerprint, len(rows)), df, breakpoints, aggregates, source=fingerprint, sidecar=sidecar,
+                    appended=len(rows))
+
+
+def incremental_state(snapshot):
+    return IncrementalAggregates(snapshot.df, snapshot.breakpoints, snapshot.aggregates)
+
+
+class DatasetStore:
+    # Process-wide snapshots by path. A read is a dict lookup plus a stat of the file; when the fingerprint
+    # changes, one thread builds the new snapshot while the others keep reading the old one, and the new one
+    # replaces it in a single assignment, so no reader ever sees half of two versions.
+
+    def __init__(self, build=build_snapshot):
+        self.build = build
+        self.snapshots = {}
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        fingerprint = file_fingerprint(path)
+        snapshot = self.snapshots.get(path)
+        if snapshot is not None and snapshot.source == fingerprint:
+            return snapshot
+        # Only a cold store makes readers wait; otherwise the stale snapshot is served during the rebuild
+        if not self.lock.acquire(blocking=snapshot is None):
+            return snapshot
+        try:
+            current = self.snapshots.get(path)
+            if current is None or current.source != fingerprint:
+                current = self.build(path, fingerprint)
+                self.snapshots = {**self.snapshots, path: current}
+            return current
+        finally:
+            self.lock.release()
+
+    def append(self, path, batch):
+        # Folds new listings (cleaned csv layout) into the current snapshot's aggregates in O(batch + cube)
+        # instead of rewriting the csv and rebuilding. The new snapshot is swapped in like a rebuilt one; its
+        # frame, cells and names are only put together when a reader first asks for them. The batch's rows and
+        # cells are saved next to the csv's aggregates, with the cube and cut-points, so a restart picks them up.
+        # A batch apply_schema cannot type raises ValueError before anything changes
+        check_listings(batch)
+        self.get(path)
+        with self.lock:
+            current = self.snapshots[path]
+            state = current.derive('incremental', incremental_state)
+            batch = apply_schema(batch.reset_index(drop=True))
+            moved = state.append(batch.copy())
+            frame, aggregates = state.view()
+            appended = current.appended + len(batch)
+            snapshot = Snapshot(path, (*current.source, appended), frame, state.breakpoints, LazyAggregates(aggregates),
+                                source=current.source, sidecar=current.sidecar, appended=appended)
+            snapshot.derived['incremental'] = state
+            self.snapshots = {**self.snapshots, path: snapshot}
+            if snapshot.sidecar is not None:
+                try:
+                    # A re-bucketized append renumbered every listing's cell, so all of them are saved once
+                    cells = state.cells if moved else state.cell_parts[-1]
+                    save_batch(appended_folder(snapshot.sidecar), batch, cells, state.cube, state.breakpoints,
+                               rebased=bool(moved))
+                except (OSError, ImportError):
+                    pass
+        return snapshot
+
+    def warm(self, path):
+        # Loads in the background, e.g. at server start before the first session connects
+        thread = threading.Thread(target=self.get, args=(path,), daemon=True)
+        thread.start()
+        return thread
+
+
+STORE = DatasetStore()
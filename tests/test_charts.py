@@ -0,0 +1,23 @@
+import os
+
+import pandas as pd
+
+from aggregates import build_aggregates
+from charts import CHARTS, ChartData
+from cuisine_index import CuisineIndex
+from data import apply_schema
+from features import add_features
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_charts_build_for_a_selection_without_cuisine_pairs():
+    # Three listings: too few for any frequent cuisine pair or a second location
+    df = apply_schema(pd.read_csv(os.path.join(ROOT, 'zomato_cleaned.csv')))
+    df = df[(df['location'] == 'MG Road') & df['rest_type'].isin(['Cafe', 'Casual Dining'])
+            & df['type'].isin(['Pubs and bars', 'Desserts']) & df['online_order'] & df['book_table']].reset_index(drop=True)
+    add_features(df)
+    cube = build_aggregates(df)['cube']
+    data = ChartData(cube, cube, build_aggregates(df)['names'], CuisineIndex(cube['cuisines']), frame=df)
+    for build in CHARTS.values():
+        assert build(data).to_json()
@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+import pytest
+
+from aggregates import build_aggregates
+from data import apply_schema, read_dataset
+from features import add_features
+from insights import CONFIDENCE, RESAMPLES, means
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def listings():
+    df = apply_schema(read_dataset(os.path.join(ROOT, 'zomato_cleaned.csv')))
+    add_features(df)
+    return df, build_aggregates(df)['cube']
+
+
+def listing_bootstrap(values, resamples=RESAMPLES, seed=1):
+    # The reference: resampling the listings themselves
+    values = np.asarray(values, dtype='float64')
+    rng = np.random.default_rng(seed)
+    resampled = np.array([values[rng.integers(0, len(values), len(values))].mean() for _ in range(resamples)])
+    return np.quantile(resampled, [(1 - CONFIDENCE) / 2, (1 + CONFIDENCE) / 2])
+
+
+@pytest.mark.parametrize('by, measure, group', [('online_order', 'votes', True), ('online_order', 'votes', False),
+                                                ('book_table', 'rate', True),
+                                                ('location', 'avg_cost_per_plate', 'Church Street')])
+def test_intervals_match_a_listing_level_bootstrap(listings, by, measure, group):
+    df, cube = listings
+    low, high = listing_bootstrap(df.loc[df[by] == group, measure])
+    row = means(cube, by, measure).loc[group]
+    # Within a tenth of the reference width at either end
+    assert abs(row['low'] - low) < 0.1 * (high - low)
+    assert abs(row['high'] - high) < 0.1 * (high - low)
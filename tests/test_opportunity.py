@@ -0,0 +1,45 @@
+import http.client
+import json
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from opportunity import MAX_K, serve
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def server(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('data') / 'zomato.csv')
+    pd.read_csv(os.path.join(ROOT, 'zomato_cleaned.csv'), nrows=5000).to_csv(path, index=False)
+    server = serve(path, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server, query):
+    connection = http.client.HTTPConnection(*server.server_address)
+    connection.request('GET', f'/opportunities?{query}')
+    response = connection.getresponse()
+    body = json.loads(response.read())
+    connection.close()
+    return response.status, body
+
+
+def test_k_limits_the_results(server):
+    status, body = get(server, 'k=5')
+    assert status == 200
+    assert len(body['results']) == 5
+
+
+@pytest.mark.parametrize('k', ['-1', '0', str(MAX_K + 1), '100000', 'abc'])
+def test_out_of_range_k_is_rejected(server, k):
+    status, body = get(server, f'k={k}')
+    assert status == 400
+    assert 'results' not in body
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from similarity import METHODS, similarity_matrix
+
+
+def profiles(blocks):
+    locations = pd.Index(['A', 'B', 'C'], name='location')
+    return pd.concat({name: pd.DataFrame(values, index=locations) for name, values in blocks.items()}, axis=1)
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_blocks_missing_from_the_selection_are_left_out(method):
+    # Only 'others' cuisines selected: pd.concat drops the empty cuisines block
+    blocks = {'rest_type': [[1, 0], [0.5, 0.5], [0, 1]], 'cost_category': [[1, 0], [1, 0], [0, 1]],
+              'rate': [[0.8, 0.2], [0.7, 0.3], [0.6, 0.4]]}
+    similarity = similarity_matrix(profiles(blocks), method)
+    assert similarity.shape == (3, 3)
+    assert np.allclose(np.diag(similarity), 1, atol=1e-5)
+    # Same as weighting only the blocks that are there
+    weights = {'rest_type': 0.25, 'cost_category': 0.2, 'rate': 0.15}
+    assert np.allclose(similarity, similarity_matrix(profiles(blocks), method, weights))
@@ -0,0 +1,149 @@
+import os
+
+import pandas as pd
+import pytest
+
+from aggregates import build_aggregates, rollup
+from charts import ChartData
+from cuisine_index import CuisineIndex
+from data import apply_schema, file_fingerprint
+from features import add_features
+from incremental import appended_folder
+from store import DatasetStore, build_snapshot
+from viewer import build_viewer_index, page
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROWS, BATCH = 3000, 400
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    # A slice of the shipped csv, and the next listings as the batch to append
+    source = pd.read_csv(os.path.join(ROOT, 'zomato_cleaned.csv'), nrows=ROWS + BATCH)
+    path = str(tmp_path / 'zomato.csv')
+    source.iloc[:ROWS].to_csv(path, index=False)
+    return path, source.iloc[ROWS:]
+
+
+def counting_store():
+    builds = []
+
+    def build(path, fingerprint):
+        builds.append(path)
+        return build_snapshot(path, fingerprint)
+    return DatasetStore(build), builds
+
+
+def location_counts(snapshot):
+    # What the location charts read: the snapshot's cube as ChartData
+    cube = snapshot.aggregates['cube']
+    data = ChartData(cube, cube, snapshot.aggregates['names'], CuisineIndex(cube['cuisines']), frame=snapshot.df)
+    counts = rollup(data.cube, 'location')['count']
+    return counts.set_axis(counts.index.astype(str)).sort_index()
+
+
+def test_append_updates_dashboard_data_without_rebuild(dataset):
+    path, batch = dataset
+    store, builds = counting_store()
+    before = store.get(path)
+    csv = file_fingerprint(path)
+
+    after = store.append(path, batch)
+
+    assert builds == [path]
+    assert store.get(path) is after
+    assert file_fingerprint(path) == csv
+    assert after.fingerprint != before.fingerprint
+    assert len(after.df) == ROWS + BATCH
+    assert after.aggregates['cube']['count'].sum() == ROWS + BATCH
+    assert len(after.aggregates['cells']) == ROWS + BATCH
+    # The served snapshot is untouched by the append
+    assert before.aggregates['cube']['count'].sum() == ROWS
+
+    expected = apply_schema(pd.concat([pd.read_csv(path), batch], ignore_index=True))
+    add_features(expected, after.breakpoints)
+    cube = build_aggregates(expected)['cube']
+    counts = rollup(cube, 'location')['count']
+    assert location_counts(after).equals(counts.set_axis(counts.index.astype(str)).sort_index())
+    assert not location_counts(after).equals(location_counts(before))
+
+
+def test_appended_listings_survive_a_restart(dataset):
+    path, batch = dataset
+    store, _ = counting_store()
+    store.get(path)
+    after = store.append(path, batch.iloc[:BATCH // 2])
+    after = store.append(path, batch.iloc[BATCH // 2:])
+    assert os.path.isdir(appended_folder(after.sidecar))
+
+    restarted, builds = counting_store()
+    snapshot = restarted.get(path)
+    assert builds == [path]
+    assert snapshot.fingerprint == after.fingerprint
+    assert len(snapshot.df) == ROWS + BATCH
+    assert location_counts(snapshot).equals(location_counts(after))
+
+
+def test_append_only_writes_the_batch(dataset):
+    path, batch = dataset
+    store, _ = counting_store()
+    store.get(path)
+    first = store.append(path, batch.iloc[:BATCH // 2])
+    folder = appended_folder(first.sidecar)
+    saved = {file: os.stat(os.path.join(folder, file)).st_mtime_ns for file in os.listdir(folder) if file.startswith(('rows-', 'cells-'))}
+
+    after = store.append(path, batch.iloc[BATCH // 2:])
+    # Nothing is concatenated until a reader asks, and earlier batches are left on disk as they were
+    assert 'df' not in after.derived
+    assert callable(after.aggregates.pieces['cells'])
+    assert saved and all(os.stat(os.path.join(folder, file)).st_mtime_ns == mtime for file, mtime in saved.items())
+    assert len(after.df) == ROWS + BATCH
+    assert len(after.aggregates['cells']) == ROWS + BATCH
+
+
+def test_rebucketized_appends_survive_a_restart(dataset):
+    path, batch = dataset
+    store, _ = counting_store()
+    before = store.get(path)
+    # Enough expensive listings to move the cost cut-points, so every listing is re-bucketized
+    expensive = pd.concat([batch] * 10, ignore_index=True).assign(cost2plates=6000)
+    after = store.append(path, expensive)
+    assert any(not (after.breakpoints[name] == before.breakpoints[name]).all() for name in before.breakpoints)
+    after = store.append(path, batch)
+
+    restarted, _ = counting_store()
+    snapshot = restarted.get(path)
+    assert len(snapshot.df) == ROWS + 11 * BATCH
+    assert snapshot.aggregates['cube']['count'].sum() == ROWS + 11 * BATCH
+    assert location_counts(snapshot).equals(location_counts(after))
+    # Every listing is in the cube cell it was counted in
+    cells = snapshot.aggregates['cells']['cell'].to_numpy()
+    assert (pd.Series(cells).value_counts().sort_index().to_numpy() == snapshot.aggregates['cube']['count'].to_numpy()).all()
+
+
+def test_appended_categories_sort_alphabetically(dataset):
+    path, batch = dataset
+    store, _ = counting_store()
+    store.get(path)
+    after = store.append(path, batch.assign(location='Aaa New Area', name='Aaa New Restaurant'))
+    # The new categories come after the existing ones, the viewer still sorts them first
+    assert after.df['location'].cat.categories[-1] == 'Aaa New Area'
+    index = build_viewer_index(after.df)
+    rows, _ = page(after.df, index, sort_by='location', descending=False)
+    assert rows['location'].iloc[0] == 'Aaa New Area'
+    for column in ['location', 'name']:
+        rows, _ = page(after.df, index, sort_by=column, descending=False, size=len(after.df))
+        assert rows[column].is_monotonic_increasing
+
+
+@pytest.mark.parametrize('change', [lambda batch: batch.drop(columns='location'),
+                                    lambda batch: batch.assign(rate='4.1/5'),
+                                    lambda batch: batch.assign(book_table='sometimes')])
+def test_malformed_batches_are_rejected(dataset, change):
+    path, batch = dataset
+    store, _ = counting_store()
+    before = store.get(path)
+    with pytest.raises(ValueError):
+        store.append(path, change(batch))
+    assert store.get(path) is before
+    assert not os.path.exists(appended_folder(before.sidecar))
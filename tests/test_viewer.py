@@ -0,0 +1,36 @@
+import os
+
+import pandas as pd
+
+from data import apply_schema
+from features import add_features
+from profiling import table_bytes
+from viewer import build_viewer_index, page
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROWS = 2000
+
+
+def dataset(extra):
+    # The csv's first listings plus `extra` listings with new names and locations and no votes, so the top
+    # page by votes has the same rows while the categories grow with the dataset; the category cut-points
+    # are the csv slice's, so the page's rows are identical
+    df = pd.read_csv(os.path.join(ROOT, 'zomato_cleaned.csv'), nrows=ROWS)
+    breakpoints = add_features(apply_schema(df.copy()))
+    filler = df.sample(extra, replace=True, random_state=0).reset_index(drop=True)
+    filler = filler.assign(name=[f'new {i}' for i in range(extra)], location=[f'area {i % 500}' for i in range(extra)],
+                           votes=0)
+    df = apply_schema(pd.concat([df, filler], ignore_index=True))
+    add_features(df, breakpoints)
+    return df
+
+
+def page_bytes(df, **options):
+    rows, _ = page(df, build_viewer_index(df), **options)
+    return table_bytes(rows)
+
+
+def test_page_payload_does_not_grow_with_the_dataset():
+    small, large = dataset(10), dataset(50000)
+    assert page_bytes(small) == page_bytes(large)
+    assert page_bytes(small, query='cafe') == page_bytes(large, query='cafe')
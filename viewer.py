@@ -0,0 +1,60 @@
+import numpy as np
+
+SEARCH_COLUMNS = ['name', 'location', 'cuisines']
+SORT_COLUMNS = ['name', 'location', 'rate', 'votes', 'avg_cost_per_plate']
+PAGE_SIZE = 50
+
+
+def sort_key(values):
+    # Categories added by appends come after the existing ones (see IncrementalAggregates.extend_categories),
+    # so categoricals sort on the alphabetical rank of their category rather than on its code
+    if not hasattr(values, 'cat'):
+        return values.to_numpy()
+    rank = np.empty(len(values.cat.categories), dtype='int64')
+    rank[np.argsort(values.cat.categories.to_numpy(), kind='stable')] = np.arange(len(rank))
+    codes = values.cat.codes.to_numpy()
+    return np.where(codes >= 0, rank[codes], -1)
+
+
+def build_viewer_index(df):
+    # search: lower-cased distinct values + row codes per searchable column, so a query scans the
+    #         distinct strings once and maps back to rows with one vectorized isin
+    # order:  stable row order per sortable column
+    return {
+        'search': {column: (df[column].cat.categories.str.lower(), df[column].cat.codes.to_numpy())
+                   for column in SEARCH_COLUMNS},
+        'order': {column: np.argsort(sort_key(df[column]), kind='stable').astype('int32') for column in SORT_COLUMNS},
+    }
+
+
+def search_mask(index, query):
+    query = query.strip().lower()
+    if not query:
+        return None
+    mask = None
+    for categories, codes in index['search'].values():
+        hits = np.isin(codes, np.flatnonzero(categories.str.contains(query, regex=False)))
+        mask = hits if mask is None else mask | hits
+    return mask
+
+
+def page(df, index, query='', sort_by='votes', descending=True, number=1, size=PAGE_SIZE, mask=None):
+    # Returns one page of rows and the number of rows matching in total; only the page is materialized
+    matched = search_mask(index, query)
+    if mask is not None:
+        matched = mask if matched is None else matched & mask
+
+    order = index['order'][sort_by]
+    if descending:
+        order = order[::-1]
+    if matched is not None:
+        order = order[matched[order]]
+
+    start = (number - 1) * size
+    return plain(df.iloc[order[start:start + size]]), len(order)
+
+
+def plain(rows):
+    # A slice of a categorical frame still carries every category, and Arrow ships them all as the column's
+    # dictionary; plain values keep a page's payload at the size of its rows whatever the dataset size
+    return rows.astype({column: object for column, dtype in rows.dtypes.items() if hasattr(dtype, 'categories')})